@@ -11,28 +11,40 @@ import alembic.config
 import alembic.script
 from alembic.runtime.environment import EnvironmentContext
 import binascii
+import collections
+import concurrent.futures
 import datetime
+import functools
 import grp
-import hashlib
+import itertools
 import os
 import os.path
-import pymysql
 import pwd
+import queue
 import socket
+import sqlite3
 from sqlalchemy import create_engine
 import sqlalchemy.orm
 import stat
 import subprocess
 import sys
-import time
 
 # -*- coding: utf-8 -*-
 
+from secondshot.catalog import Catalog, FileIndex, PathCache
 from secondshot.config import Config
 from secondshot.constants import Constants
-from secondshot.models import File, Host, Saveset, Volume, metadata, \
+from secondshot.hashcache import HashCache
+from secondshot.hasher import Hasher
+from secondshot.ledger import VerifyBudget
+from secondshot.manifest import Manifest
+from secondshot.models import Host, Saveset, Volume, metadata, \
     AlembicVersion
+from secondshot.progress import Progress
+from secondshot.report import VerifyReport
+from secondshot.scheduler import IOScheduler
 from secondshot.syslogger import Syslog
+from secondshot.walker import Walker
 
 
 class Actions(object):
@@ -72,6 +84,8 @@ class Actions(object):
         self.rsnapshot_cfg = cfg.rsnapshot_cfg()
         self.time_fmt = '%Y-%m-%d %H:%M:%S'
         self.volume = runtime['volume']
+        self.paths = PathCache(self.session, self.engine)
+        self.hash_cache = None
 
         if ('snapshot_root' in self.rsnapshot_cfg):
             Config.snapshot_root = self.rsnapshot_cfg[
@@ -101,6 +115,8 @@ class Actions(object):
                 id=saveset_id).one().location
             saveset = self.session.query(Saveset).filter_by(
                 id=saveset_id).one().saveset
+            host_id = self.session.query(Saveset).filter_by(
+                id=saveset_id).one().host_id
         except Exception as ex:
             Syslog.logger.warn('action=calc_sums msg=%s' % str(ex))
             Syslog.logger.traceback(ex)
@@ -108,47 +124,238 @@ class Actions(object):
             sys.exit('action=calc_sums msg=missing host/location')
         Syslog.logger.info('START action=calc_sums saveset=%s from host=%s '
                            'for location=%s' % (saveset, host, location))
-        manifest_file = os.path.join(
-            Config.snapshot_root, location, host, Config.manifest)
-        with open(manifest_file, 'r+') as mfile:
-            mfile.readline()
-            position = mfile.tell()
-            (numbytes, count, total) = (0, 0, 0)
-            for line in iter(mfile.readline, ''):
-                file_id, file_type, size, has_sum = line.strip().split(',')
-                total += int(size)
-                if has_sum != 'Y' and file_type == 'f' and int(size) > 0:
-                    count += 1
-                    try:
-                        file = self.session.query(File).filter_by(
-                            id=file_id).one()
-                        filename = os.path.join(
-                            Config.snapshot_root, location, file.path,
-                            file.filename)
-                        file.shasum = self._filehash(filename, Config.hashtype)
-                        self.session.add(file)
-                        mfile.seek(position)
-                        mfile.write(
-                            '%s,%s,%s,Y\n' % (file_id, file_type, size))
-                        numbytes += file.size
-                    except Exception as ex:
-                        Syslog.logger.warn(
-                            'action=calc_sums id=%d msg=skipped error=%s'
-                            % (file.id, str(ex)))
-                    if (count % 1000 == 0):
-                        Syslog.logger.debug(
-                            'action=calc_sums count=%d bytes=%d'
-                            % (count, numbytes))
-                        self.session.commit()
-                position = mfile.tell()
+        manifest = Manifest(os.path.join(
+            Config.snapshot_root, location, host, Config.manifest))
+        manifest.open_update()
+        self._open_hash_cache()
+        catalog = Catalog(self.session, self.engine, host_id, self.time_fmt)
+        scheduler = IOScheduler(Config.io_order)
+        progress = Progress(self.session, saveset_id, 'calc_sums')
+        if (Config.resume and progress.load()):
+            Syslog.logger.info('action=calc_sums saveset=%s msg=resuming '
+                               'position=%d' % (saveset, progress.position))
+        hashers = queue.Queue()
+        for _ in range(Config.hash_workers):
+            hashers.put(Hasher())
+        block = []
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=Config.hash_workers) as pool:
+            for entry in manifest.entries(start=progress.position):
+                progress.add(entry)
+                if entry.has_sum or entry.type != 'f' or entry.size == 0:
+                    progress.done(entry, size=entry.size)
+                    continue
+                block.append(entry)
+                if (len(block) >= Constants.MAX_INSERT):
+                    self._calc_sums_block(
+                        catalog, scheduler, pool, hashers, location, block,
+                        manifest, progress)
+                    block = []
+            self._calc_sums_block(
+                catalog, scheduler, pool, hashers, location, block, manifest,
+                progress)
+        manifest.close()
 
+        progress.clear()
         self.session.commit()
+        (total, numbytes) = (progress.counters.get('size', 0),
+                             progress.counters.get('processed', 0))
         Syslog.logger.info('FINISHED action=calc_sums saveset=%s '
-                           'processed=%.3fGB' %
-                           (saveset, float(numbytes) / 1e9))
+                           'processed=%.3fGB rate=%.1fMB/s' %
+                           (saveset, float(numbytes) / 1e9,
+                            sum(hasher.throughput() for hasher in
+                                hashers.queue) / 1e6))
         return {'calc_sums': dict(
             status='ok', saveset=saveset, size=total, processed=numbytes)}
 
+    def calc_sums_savesets(self, savesets):
+        """Calculate missing checksums of existing savesets, such as one
+        whose start was interrupted; with resume, each continues from
+        its saved position
+
+        Args:
+            savesets (list): saveset names
+        Returns:
+            result (dict):   results summary of each saveset
+        Raises:
+            RuntimeError: if saveset is missing
+        """
+        results = []
+        for saveset in savesets:
+            try:
+                record = self.session.query(Saveset).filter_by(
+                        saveset=saveset).one()
+            except sqlalchemy.orm.exc.NoResultFound:
+                raise RuntimeError('CALC_SUMS saveset=%s not found' % saveset)
+            results.append(self.calc_sums(record.id)['calc_sums'])
+        return {'calc_sums': dict(status='ok', results=results)}
+
+    def _calc_sums_block(self, catalog, scheduler, pool, hashers, location,
+                         entries, manifest, progress):
+        """Hash a block of files in the worker pool, in the order given
+        by the I/O scheduler, then store their checksums with one bulk
+        update, mark them in the manifest and save the progress cursor
+
+        Args:
+            catalog (obj):   Catalog instance for the saveset's host
+            scheduler (obj): IOScheduler instance
+            pool (obj):      concurrent.futures executor
+            hashers (obj):   queue.Queue of Hasher instances
+            location (str):  saveset location under snapshot root
+            entries (list):  ManifestEntry items lacking checksums
+            manifest (obj):  Manifest opened for update
+            progress (obj):  Progress cursor of the saveset
+        Returns:
+            int: bytes processed
+        """
+        names = catalog.get_names([entry.file_id for entry in entries])
+        chunk_size = Config.chunk_size * 1048576
+        pending = []
+        for entry in entries:
+            if (entry.file_id not in names):
+                Syslog.logger.warn('action=calc_sums id=%d msg=skipped '
+                                   'error=not found' % entry.file_id)
+                continue
+            path_id, filename = names[entry.file_id]
+            pending.append((entry, os.path.join(
+                self.paths.get_path(path_id), filename)))
+        futures = []
+        for entry, path in scheduler.sort(pending, lambda item: (
+                item[0].dev, item[0].ino, os.path.join(
+                    Config.snapshot_root, location, item[1]))):
+            if (chunk_size and entry.size > chunk_size):
+                # Each chunk of a large file goes to the pool separately
+                futures.append((entry, [(offset, min(
+                    chunk_size, entry.size - offset), pool.submit(
+                        self._pool_chunk, hashers, location, path,
+                        Config.hashtype, offset, chunk_size))
+                    for offset in range(0, entry.size, chunk_size)]))
+            else:
+                futures.append((entry, pool.submit(
+                    self._pool_digest, hashers, location, path,
+                    [Config.hashtype])))
+        (sums, roots, chunks, stored, numbytes) = ([], [], {}, [], 0)
+        for entry, future in futures:
+            try:
+                if (isinstance(future, list)):
+                    items = [(offset, size, item.result())
+                             for offset, size, item in future]
+                    roots.append((entry.file_id, Hasher.merkle_root(
+                        [item[2] for item in items], Config.hashtype)))
+                    chunks[entry.file_id] = items
+                else:
+                    sums.append((entry.file_id, future.result()[0]))
+            except Exception as ex:
+                Syslog.logger.warn(
+                    'action=calc_sums id=%d msg=skipped error=%s'
+                    % (entry.file_id, str(ex)))
+                continue
+            stored.append(entry)
+            numbytes += entry.size
+        catalog.update_sums(sums, Config.hashtype)
+        catalog.update_chunks(chunks)
+        catalog.update_sums(roots, Constants.MERKLE_PREFIX + Config.hashtype)
+        for entry in stored:
+            manifest.mark(entry)
+        stored = set(entry.file_id for entry in stored)
+        for entry in entries:
+            progress.done(entry, size=entry.size, processed=entry.size
+                          if entry.file_id in stored else 0)
+        progress.save()
+        self.session.commit()
+        if (self.hash_cache):
+            self.hash_cache.commit()
+        Syslog.logger.debug('action=calc_sums count=%d bytes=%d'
+                            % (len(stored), numbytes))
+        return numbytes
+
+    def _pool_digest(self, hashers, location, path, hashtypes,
+                     cached=True):
+        """Hash a file with whichever Hasher is free in a pool
+
+        Args:
+            hashers (obj):    queue.Queue of Hasher instances
+            location (str):   saveset location under snapshot root
+            path (str):       path of file relative to location
+            hashtypes (list): types of hash
+            cached (bool):    use the hash cache
+        Returns:
+            list: binary digests
+        """
+        hasher = hashers.get()
+        try:
+            return self._digest(hasher, location, path, hashtypes,
+                                cached=cached)
+        finally:
+            hashers.put(hasher)
+
+    @staticmethod
+    def _pool_chunk(hashers, location, path, hashtype, offset, length):
+        """Hash one chunk of a large file with whichever Hasher is free
+        in a pool
+
+        Args:
+            hashers (obj):  queue.Queue of Hasher instances
+            location (str): saveset location under snapshot root
+            path (str):     path of file relative to location
+            hashtype (str): type of hash
+            offset (int):   starting byte of chunk
+            length (int):   chunk size in bytes
+        Returns:
+            bytes: binary digest
+        """
+        hasher = hashers.get()
+        try:
+            return hasher.digest_range(os.path.join(
+                Config.snapshot_root, location, path), hashtype, offset,
+                length)
+        finally:
+            hashers.put(hasher)
+
+    def _digest(self, hasher, location, path, hashtypes, cached=True):
+        """Get a file's digests from the hash cache, or read the file
+        once and add them to the cache. Verify passes cached=False to
+        read the file itself rather than compare a digest with the one
+        it was made from
+
+        Args:
+            hasher (obj):     Hasher instance
+            location (str):   saveset location under snapshot root
+            path (str):       path of file relative to location
+            hashtypes (list): types of hash
+            cached (bool):    use the hash cache
+        Returns:
+            list: binary digests, in the same order as hashtypes
+        Raises:
+            OS exceptions
+        """
+        filename = os.path.join(Config.snapshot_root, location, path)
+        if (not self.hash_cache or not cached):
+            return hasher.digests(filename, hashtypes)
+        stat = os.stat(filename)
+        digests = [self.hash_cache.get(stat, hashtype)
+                   for hashtype in hashtypes]
+        if (None in digests):
+            digests = hasher.digests(filename, hashtypes)
+            for hashtype, digest in zip(hashtypes, digests):
+                self.hash_cache.put(stat, hashtype, digest, path)
+        return digests
+
+    def _open_hash_cache(self):
+        """Open the hash cache on the backup volume, if not already
+        open; runs without a cache if it can't be opened"""
+
+        if (self.hash_cache is None):
+            filename = os.path.join(Config.snapshot_root,
+                                    Constants.HASH_CACHE)
+            try:
+                self.hash_cache = HashCache(filename)
+            except sqlite3.Error as ex:
+                Syslog.logger.warn('action=hash_cache file=%s msg=%s' %
+                                   (filename, str(ex)))
+                self.hash_cache = False
+        return self.hash_cache
+
     def inject(self, host, volume, pathname, saveset_id):
         """Inject filesystem metadata for each file in a saveset into manifest
 
@@ -168,130 +375,97 @@ class Actions(object):
         except Exception as ex:
             sys.exit('action=inject Invalid host or volume: %s' % str(ex))
 
-        mfile = open(os.path.join(pathname, host,
-                                  Config.manifest), 'w')
-        mfile.write('file_id,type,file_size,has_checksum\n')
+        manifest = Manifest(os.path.join(pathname, host, Config.manifest),
+                            Config.manifest_format)
+        catalog = Catalog(self.session, self.engine, host_record.id,
+                          self.time_fmt)
+        previous = self._previous_inodes(saveset, catalog)
+        manifest.create()
 
-        (count, numbytes, skipped) = (0, 0, 0)
-        for dirpath, _, filenames in os.walk(os.path.join(
-                pathname, host)):
-            for filename in filenames:
-                if filename == Config.manifest:
-                    continue
-                try:
-                    stat = os.lstat(os.path.join(dirpath, filename))
-                    _path = pymysql.escape_string(os.path.relpath(
-                        dirpath, os.path.join(
-                            Config.snapshot_root, Constants.SYNC_PATH)).encode(
-                                'utf8', 'surrogateescape').decode('utf8'))
-                    _filename = pymysql.escape_string(filename.encode(
-                        'utf8', 'surrogateescape').decode('utf8'))
-                except OSError as ex:
-                    if ex.errno != 2:
-                        Syslog.logger.error(
-                            'action=inject filename=%s message=%s' %
-                            (filename, str(ex)))
-                        raise
-                    skipped += 1
-                    Syslog.logger.debug('action=inject path=%s filename=%s '
-                                        'msg=%s' %
-                                        (dirpath, filename, str(ex)))
-                    continue
-                except UnicodeDecodeError as ex:
-                    msg = 'action=inject inode=inode=%d dev=%s' % (
-                        stat.st_ino, stat.st_dev)
-                    try:
-                        msg += ' path=%s filename=%s msg=%s' % (
-                            dirpath, filename, str(ex))
-                    except Exception:
-                        pass
-                    skipped += 1
-                    Syslog.logger.debug(msg)
+        index = None
+        if (Config.index_memory > 0):
+            index = FileIndex(catalog, Config.index_memory * 1024 * 1024)
+            index.load()
+        (pool, hashers) = (None, None)
+        if (Config.inline_hash):
+            self._open_hash_cache()
+            hashers = queue.Queue()
+            for _ in range(Config.hash_workers):
+                hashers.put(Hasher())
+            pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=Config.hash_workers)
+        last_backup = Syslog._now().strftime(self.time_fmt)
+        (batch, stats, paths) = ([], [], [])
+        (count, numbytes, indexed, reused, uncommitted) = (0, 0, 0, 0, 0)
+        walker = Walker(os.path.join(pathname, host), os.path.join(
+            Config.snapshot_root, Constants.SYNC_PATH),
+            exclude=[Config.manifest,
+                     Config.manifest + Manifest.TEMP_SUFFIX],
+            workers=Config.scan_workers)
+        try:
+            for entry in walker:
+                stat = entry.stat
+                path_id = self.paths.get_id(host_record.id, entry.path)
+                known = Manifest.lookup(previous, stat, path_id,
+                                        entry.filename)
+                if (known):
+                    # Inode is hard-linked to the prior saveset, unchanged
+                    manifest.append(known[0], known[1], known[2], stat)
+                    count += 1
+                    numbytes += stat.st_size
+                    reused += 1
                     continue
                 record = dict(
-                    path=_path,
-                    filename=_filename,
+                    path_id=path_id,
+                    filename=entry.filename,
+                    owner=self._owner(stat.st_uid),
+                    grp=self._group(stat.st_gid),
                     ctime=datetime.datetime.fromtimestamp(
                         stat.st_ctime).strftime(self.time_fmt),
                     gid=stat.st_gid,
-                    last_backup=Syslog._now().strftime(
-                        '%Y-%m-%d %H:%M:%S'),
+                    last_backup=last_backup,
                     links=stat.st_nlink,
                     mode=stat.st_mode,
                     mtime=datetime.datetime.fromtimestamp(
                         stat.st_mtime).strftime(self.time_fmt),
                     size=stat.st_size,
-                    sparseness=1,
+                    sparseness=self._sparseness(stat),
                     type=self._filetype(stat.st_mode),
                     uid=stat.st_uid,
                     host_id=host_record.id)
-                try:
-                    owner = pwd.getpwuid(stat.st_uid).pw_name
-                    group = grp.getgrgid(stat.st_gid).gr_name
-                except KeyError:
-                    owner = None
-                    group = None
-
-                for retry in range(4):
-                    try:
-                        # Bypass sqlalchemy for ON DUPLICATE KEY UPDATE and
-                        # LAST_INSERT_ID functionality
-                        if (self.engine.name == 'sqlite'):
-                            # sqlite lacks UPSERT capability, but this is
-                            # good enough for existing unit-test. TODO: fix
-                            #  this so we don't require a 'real' SQL.
-                            sql_insert = (
-                                u"INSERT OR IGNORE INTO files (%(columns)s)"
-                                u" VALUES('%(values)s');" % dict(
-                                    columns=','.join(record.keys()),
-                                    values="','".join(str(item) for item
-                                                      in record.values()),
-                                    owner=owner, group=group))
-                            sql_id = 'LAST_INSERT_ROWID()'
-                        else:
-                            sql_insert = (
-                                u"INSERT INTO files (%(columns)s)"
-                                u" VALUES('%(values)s')"
-                                u" ON DUPLICATE KEY UPDATE owner='%(owner)s',"
-                                u"grp='%(group)s',id=LAST_INSERT_ID(id),"
-                                u"last_backup=NOW();" % dict(
-                                    columns=','.join(record.keys()),
-                                    values="','".join(str(item) for item
-                                                      in record.values()),
-                                    owner=owner, group=group))
-                            sql_id = 'LAST_INSERT_ID()'
-                        self.session.execute(sql_insert)
-                        break
-                    except sqlalchemy.exc.OperationalError as ex:
-                        Syslog.logger.warn('action=inject path=%s filename=%s '
-                                           'msg=%s' %
-                                           (_path, _filename, str(ex)))
-                        if ('Deadlock found' in str(ex)):
-                            time.sleep((retry + 1) * 10)
-                        else:
-                            time.sleep(1)
-                    except Exception as ex:
-                        Syslog.logger.warn('action=inject path=%s filename=%s '
-                                           'msg=%s' %
-                                           (_path, _filename, str(ex)))
-                        time.sleep(1)
-                        raise
-                    if (retry == 4):
-                        skipped += 1
-                file_id = self.session.execute(
-                    'SELECT %s' % sql_id).fetchone()[0]
-                file = self.session.query(File).filter_by(id=file_id).one()
-                has_sha = 'Y' if file.shasum else 'N'
-                mfile.write('%d,%s,%d,%s\n' % (
-                    file_id, self._filetype(stat.st_mode), stat.st_size,
-                    has_sha))
-                count += 1
-                numbytes += stat.st_size
-                if (count % Constants.MAX_INSERT == 0):
-                    Syslog.logger.debug('action=inject count=%d' % count)
-                    self.session.commit()
-
-        mfile.close()
+                record['fingerprint'] = catalog.fingerprint(record)
+                known = index.get(record) if index else None
+                if (known):
+                    manifest.append(known[0], record['type'], known[1], stat)
+                    count += 1
+                    numbytes += stat.st_size
+                    indexed += 1
+                    continue
+                batch.append(record)
+                stats.append(stat)
+                paths.append(os.path.join(entry.path, entry.filename))
+                if (len(batch) >= Constants.UPSERT_BATCH):
+                    numbytes += self._inject_flush(
+                        catalog, batch, stats, paths, manifest, pool,
+                        hashers)
+                    count += len(batch)
+                    uncommitted += len(batch)
+                    (batch, stats, paths) = ([], [], [])
+                    if (uncommitted >= Constants.MAX_INSERT):
+                        Syslog.logger.debug('action=inject count=%d' % count)
+                        self.session.commit()
+                        uncommitted = 0
+            numbytes += self._inject_flush(catalog, batch, stats, paths,
+                                           manifest, pool, hashers)
+            count += len(batch)
+        finally:
+            if (pool):
+                pool.shutdown()
+        skipped = walker.skipped
+        if (pool and self.hash_cache):
+            self.hash_cache.commit()
+
+        manifest.commit()
         self.session.commit()
         saveset.finished = sqlalchemy.func.now()
         saveset.files = count
@@ -299,11 +473,84 @@ class Actions(object):
         self.session.add(saveset)
         self.session.commit()
         Syslog.logger.info('FINISHED action=inject saveset=%s, file_count=%d, '
-                           'skipped=%d' % (saveset.saveset, count, skipped))
+                           'reused=%d indexed=%d skipped=%d' % (
+                               saveset.saveset, count, reused, indexed,
+                               skipped))
         return {'inject': dict(
             status='ok', saveset=saveset.saveset, file_count=count,
             skipped=skipped)}
 
+    def _inject_flush(self, catalog, batch, stats, paths, manifest, pool,
+                      hashers):
+        """Write a batch of file records to the catalog and manifest;
+        with inline hashing, also checksum the new files in the batch
+
+        Args:
+            catalog (obj):  Catalog instance for the host
+            batch (list):   dicts of column values
+            stats (list):   os.stat_result of each file in batch
+            paths (list):   path of each file relative to location
+            manifest (obj): Manifest opened for writing
+            pool (obj):     ThreadPoolExecutor for inline hashing, or None
+            hashers (obj):  queue.Queue of Hasher instances, or None
+        Returns:
+            int: total bytes of files in batch
+        """
+        results = catalog.upsert(batch)
+        if (pool):
+            # Only rows the catalog has no checksum for are read; files
+            # to be chunked are left to calc_sums
+            futures = [pool.submit(
+                self._pool_digest, hashers, Constants.SYNC_PATH, path,
+                [Config.hashtype]) if (
+                    not has_sum and record['type'] == 'f' and
+                    file_stat.st_size > 0 and (
+                        not Config.chunk_size or file_stat.st_size <=
+                        Config.chunk_size * 1048576)) else None
+                for record, file_stat, path, (_, has_sum) in zip(
+                    batch, stats, paths, results)]
+            sums = []
+            for item, (record, future) in enumerate(zip(batch, futures)):
+                if (not future):
+                    continue
+                try:
+                    sums.append((results[item][0], future.result()[0]))
+                    results[item] = (results[item][0], True)
+                except Exception as ex:
+                    Syslog.logger.warn(
+                        'action=inject filename=%s msg=not hashed error=%s'
+                        % (record['filename'], str(ex)))
+            catalog.update_sums(sums, Config.hashtype)
+        numbytes = 0
+        for record, file_stat, (file_id, has_sum) in zip(
+                batch, stats, results):
+            manifest.append(file_id, record['type'], has_sum, file_stat)
+            numbytes += record['size']
+        return numbytes
+
+    def _previous_inodes(self, saveset, catalog):
+        """Load an inode index of the most recent finished saveset for
+        the same host; rsnapshot hard-links its unchanged files into
+        the new saveset
+
+        Args:
+            saveset (obj): Saveset record being injected
+            catalog (obj): Catalog instance for the host
+        Returns:
+            dict: index as returned by Manifest.inode_index()
+        """
+        record = self.session.query(Saveset).filter(
+            Saveset.host_id == saveset.host_id,
+            Saveset.id != saveset.id,
+            Saveset.finished.isnot(None),
+            Saveset.location.isnot(None)).order_by(
+                Saveset.finished.desc(), Saveset.id.desc()).first()
+        if (not record):
+            return {}
+        return Manifest(os.path.join(
+            Config.snapshot_root, record.location, saveset.host.hostname,
+            Config.manifest)).inode_index(catalog.get_names)
+
     def rotate(self, interval):
         """Rotate backup entries based on specified interval
         Args:
@@ -345,6 +592,9 @@ class Actions(object):
         else:
             sys.exit('action=rotate interval=%s unrecognized' % interval)
 
+        # All steps below are one transaction, each looking up savesets
+        # by backup host and location through index9
+
         # delete savesets that match <interval>.<interval_max - 1>
         count = self.session.query(Saveset).filter_by(
             location='%s.%d' % (interval, interval_max - 1),
@@ -359,26 +609,33 @@ class Actions(object):
                 'action=rotate host=%s location=%s.%d savesets=%d removed' %
                 (self.backup_host, interval, interval_max - 1, count))
 
-        # move all savesets location <interval>.<n> => <n+1>
-        if (self.engine.name == 'sqlite'):
-            self.session.execute(
-                "UPDATE savesets SET location='%(interval)s'||'.'||"
-                "(SUBSTR(location,INSTR(location,'.')+1)+1) WHERE location "
-                "LIKE '%(interval)s%%' AND backup_host_id=%(host)d" % {
-                    'interval': interval, 'host': host_record.id})
-        else:
-            self.session.execute(
-                "UPDATE savesets SET location=CONCAT('%(interval)s','.',"
-                "SUBSTR(location,INSTR(location,'.')+1)+1) WHERE location "
-                "LIKE '%(interval)s%%' AND backup_host_id=%(host)d" % {
-                    'interval': interval, 'host': host_record.id})
+        # move all savesets location <interval>.<n> => <n+1>, in one
+        # UPDATE mapping each of the few distinct locations to the next
+        renumber = {}
+        # Wildcards in the interval name must match only themselves
+        prefix = interval.replace('\\', '\\\\').replace(
+            '%', '\\%').replace('_', '\\_')
+        for (location,) in self.session.query(Saveset.location).filter(
+                Saveset.backup_host_id == host_record.id,
+                Saveset.location.like(prefix + '.%', escape='\\')).distinct():
+            suffix = location[len(interval) + 1:]
+            if (suffix.isdigit()):
+                renumber[location] = '%s.%d' % (interval, int(suffix) + 1)
+        if (renumber):
+            self.session.query(Saveset).filter(
+                Saveset.backup_host_id == host_record.id,
+                Saveset.location.in_(list(renumber))).update({
+                    Saveset.location: sqlalchemy.case(
+                        renumber, value=Saveset.location)},
+                    synchronize_session=False)
 
         # move saveset location=<previous int> to <interval>.0
         count = self.session.query(Saveset).filter(
             Saveset.location == prev,
             Saveset.backup_host_id == host_record.id,
-            Saveset.finished is not None).update({
-                Saveset.location: '%s.0' % interval})
+            Saveset.finished.isnot(None)).update({
+                Saveset.location: '%s.0' % interval},
+                synchronize_session=False)
         if (count > 0):
             results.append(dict(
                 host=self.backup_host,
@@ -392,6 +649,30 @@ class Actions(object):
         return {'rotate': dict(status='ok' if results else 'error',
                                actions=results)}
 
+    def evict_cache(self):
+        """Remove hash cache entries for inodes no longer present in any
+        saveset location of this backup host. Every entry is checked
+        against every location, so this runs on its own schedule
+        rather than as part of each rotate
+
+        Returns:
+            response (dict): number of entries removed
+        """
+
+        if (not self._open_hash_cache()):
+            return {'evict-cache': dict(status='error', removed=0)}
+        host_record = self.session.query(Host).filter_by(
+            hostname=self.backup_host).one()
+        locations = [location for (location,) in self.session.query(
+            Saveset.location).filter(
+                Saveset.backup_host_id == host_record.id,
+                Saveset.location.isnot(None)).group_by(
+                    Saveset.location).order_by(
+                        sqlalchemy.func.max(Saveset.created).desc())]
+        removed = self.hash_cache.evict([
+            os.path.join(Config.snapshot_root, item) for item in locations])
+        return {'evict-cache': dict(status='ok', removed=removed)}
+
     def start(self, hosts, volume):
         """Start a backup for each of the specified hosts; if
         successful, also calculate sha checksums for any missing
@@ -442,7 +723,8 @@ class Actions(object):
             results.append(self.calc_sums(saveset_id))
             if (Config.autoverify):
                 try:
-                    result = self.verify([new_saveset['saveset']])
+                    result = self.verify([new_saveset['saveset']],
+                                         autoverify=True)
                     results.append(result)
                     if (result['verify']['status'] != 'ok'):
                         status = 'error'
@@ -486,81 +768,500 @@ class Actions(object):
         Syslog.logger.info('START saveset=%s' % saveset.saveset)
         return dict(id=saveset.id, saveset=saveset.saveset)
 
-    def verify(self, savesets):
+    def verify(self, savesets, autoverify=False):
         """Read each file in specified savesets to verify against stored
-        checksums
+        checksums. Files are read by a pool of hash-workers threads;
+        reads for one saveset begin while those of the previous one
+        are still finishing. An inode already verified during the call
+        with the same stored checksum, e.g. hard-linked into several
+        savesets, is counted as linked rather than read again.
+
+        Each file verified is recorded in the ledger. With a verify
+        budget, only the files that have gone longest without being
+        verified are read, up to the budget; the autoverify of start
+        ignores the budget and reads all. Otherwise, a cursor of
+        each saveset's progress is saved periodically, from which an
+        interrupted verify continues when run with resume.
+
+        Each file's size, mode and mtime are first compared with the
+        catalog, and only files that match are read. At the metadata
+        verify level, no file is read, and every manifest entry is
+        checked, including symlinks, devices and files lacking a stored
+        checksum.
+
+        With a report, each file that fails is written to it as a line
+        of JSON instead of to the log, and the report ends with a
+        summary record.
 
         Parameters:
-            savesets (list): saveset names
+            savesets (list):   saveset names
+            autoverify (bool): called by start for a new saveset
         Returns:
             result (dict): summary of files checked
-                  status = ok if no errors
+                  status = ok if no errors in any saveset
                   [count = files examined
+                   linked = files verified by reference to another
+                            hard link of the same inode
                    skipped = files that couldn't be read (e.g. permissions)
-                   missing = files for which the DB has no stored checksum
-                   errors = files with content that does not match checksum]
+                   missing = manifest entries whose catalog row is gone
+                   errors = files with content that does not match checksum,
+                            or that are absent or differ from the catalog]
+                  coverage = with a budget, percent of bytes in savesets
+                             verified within the cycle
         Raises:
             RuntimeError: if saveset is missing
         """
 
-        results = []
+        budgeted = Config.verify_budget and not autoverify
+        tallies = []
         for saveset in savesets:
             try:
                 record = self.session.query(Saveset).filter_by(
                         saveset=saveset).one()
             except sqlalchemy.orm.exc.NoResultFound:
                 raise RuntimeError('VERIFY saveset=%s not found' % saveset)
+            tallies.append(dict(
+                saveset=saveset, location=record.location, count=0,
+                errors=0, linked=0, missing=0, skipped=0, rehashed=[],
+                verified=[], manifest=os.path.join(
+                    Config.snapshot_root, record.location,
+                    record.host.hostname, Config.manifest),
+                catalog=Catalog(self.session, self.engine, record.host_id,
+                                self.time_fmt),
+                progress=None if budgeted else Progress(
+                    self.session, record.id, 'verify'),
+                report=None, files=None))
+            if (Config.resume and tallies[-1]['progress'] and
+                    tallies[-1]['progress'].load()):
+                Syslog.logger.info(
+                    'action=verify saveset=%s msg=resuming position=%d' % (
+                        saveset, tallies[-1]['progress'].position))
+                for key in ['count', 'errors', 'linked', 'missing',
+                            'skipped']:
+                    tallies[-1][key] = tallies[-1]['progress'].counters.get(
+                        key, 0)
+        report = None
+        if (Config.report):
+            report = VerifyReport(Config.report)
+            for tally in tallies:
+                tally['report'] = report
+        # The report ends with a summary even if verify is cut short
+        ret = dict(status='error', error='verify did not finish')
+        try:
+            ret = self._verify_tallies(tallies, budgeted)
+        finally:
+            if (report):
+                report.close(ret)
+        return {'verify': ret}
 
-            manifest_file = os.path.join(
-                Config.snapshot_root, record.location, record.host.hostname,
-                Config.manifest)
-            mfile = open(manifest_file, 'r')
-            mfile.readline()
-            count, errors, missing, skipped = (0, 0, 0, 0)
-            for line in mfile:
-                file_id, file_type, size, has_sum = line.strip().split(',')
-                if has_sum != 'Y' or file_type != 'f' or int(size) == 0:
-                    continue
-                count += 1
-                file = self.session.query(File).filter_by(id=file_id).one()
-                if (Config.hashtype != self._hashtype(file.shasum)):
-                    Config.hashtype = self._hashtype(file.shasum)
-                    Syslog.logger.info('action=verify hashtype=%s'
-                                       % Config.hashtype)
-                try:
-                    filename = os.path.join(
-                        Config.snapshot_root, record.location, file.path,
-                        file.filename)
-                    sha = self._filehash(filename, Config.hashtype)
-                    if (sha != file.shasum):
-                        Syslog.logger.warn(
-                            'BAD CHECKSUM: action=verify file=%s/%s '
-                            'expected=%s actual=%s' %
-                            (file.path, file.filename,
-                             binascii.hexlify(file.shasum),
-                             binascii.hexlify(sha)))
-                        errors += 1
-                except Exception as ex:
-                    Syslog.logger.debug('sha(%s): %s' % (
-                        file.filename, str(ex)))
-                    skipped += 1
-                if (count % 1000 == 0):
-                    Syslog.logger.debug('action=verify count=%d skipped=%d '
-                                        'errors=%d' % (count, skipped, errors))
-            mfile.close()
-            msg = ('VERIFY: saveset=%s count=%d errors=%d missing=%d '
-                   'skipped=%d' % (saveset, count, errors, missing, skipped))
-            if (errors):
+    def _verify_tallies(self, tallies, budgeted):
+        """Read the files of the savesets set up by verify
+
+        Args:
+            tallies (list):  counters and state of each saveset
+            budgeted (bool): limit reads to the verify budget
+        Returns:
+            dict: status and results, as described for verify
+        """
+        budget = None
+        if (budgeted):
+            # Candidates are listed in one pass that also sizes up the
+            # work, since the plan must be made before any is read
+            budget = VerifyBudget(Config.verify_budget, Config.verify_cycle,
+                                  Syslog._now())
+            for tally in tallies:
+                tally['files'] = list(self._verify_files(
+                    tally['manifest'], tally))
+                for entry, file in tally['files']:
+                    budget.add(file.verified, entry.size)
+            budget.plan()
+
+        hashers = queue.Queue()
+        for _ in range(Config.hash_workers):
+            hashers.put(Hasher())
+        # Only inode tables are read at the metadata level
+        metadata = Config.verify_level == 'metadata'
+        scheduler = IOScheduler(
+            'inode' if metadata and
+            Config.io_order == 'physical' else Config.io_order)
+        self._open_hash_cache()
+        (pending, verified) = (collections.deque(), {})
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=Config.hash_workers) as pool:
+            for tally in tallies:
+                if (budget and budget.exhausted()):
+                    break
+                location = tally['location']
+                files = tally['files']
+                if (files is None):
+                    files = self._verify_files(tally['manifest'], tally)
+                if (budget):
+                    files = (item for item in files if budget.select(
+                        item[1].verified, item[0].size))
+                for entry, file in scheduler.schedule(files, lambda item: (
+                        item[0].dev, item[0].ino, os.path.join(
+                            Config.snapshot_root, location,
+                            self.paths.get_path(item[1].path_id),
+                            item[1].filename))):
+                    tally['count'] += 1
+                    if (entry.ino is not None):
+                        inode = entry.dev << 64 | entry.ino
+                        # Only an inode already found good counts; one
+                        # still pending or that failed is read again.
+                        # The metadata level stats files that may have
+                        # no checksum, so goes by inode alone and
+                        # leaves the ledger to content passes
+                        if (inode in verified and (
+                                metadata or verified[inode] == file.shasum)):
+                            tally['linked'] += 1
+                            if (not metadata):
+                                tally['verified'].append(
+                                    (file.id, file.size))
+                            if (tally['progress']):
+                                tally['progress'].done(
+                                    entry, count=1, linked=1)
+                            continue
+                    pending.append((entry, self._verify_submit(
+                        pool, hashers, location, file, tally)))
+                    if (len(pending) >= Constants.IO_WINDOW):
+                        self._verify_next(pending, verified)
+                    if (tally['count'] % 1000 == 0):
+                        Syslog.logger.debug(
+                            'action=verify count=%d skipped=%d errors=%d' %
+                            (tally['count'], tally['skipped'],
+                             tally['errors']))
+            while pending:
+                self._verify_next(pending, verified)
+
+        results = []
+        rate = sum(hasher.throughput() for hasher in hashers.queue)
+        for tally in tallies:
+            if (budget):
+                budget.verified += sum(
+                    size for _, size in tally['verified'])
+            self._verify_flush(tally)
+            if (tally['progress']):
+                tally['progress'].clear()
+                self.session.commit()
+            msg = ('VERIFY: saveset=%s count=%d errors=%d linked=%d '
+                   'missing=%d skipped=%d rate=%.1fMB/s' % (
+                       tally['saveset'], tally['count'], tally['errors'],
+                       tally['linked'], tally['missing'], tally['skipped'],
+                       rate / 1e6))
+            if (tally['errors']):
                 Syslog.logger.error(msg)
             else:
                 Syslog.logger.info(msg)
-            results.append(dict(
-                saveset=saveset, count=count, errors=errors,
-                missing=missing, skipped=skipped))
+            results.append(dict((key, tally[key]) for key in [
+                'saveset', 'count', 'errors', 'linked', 'missing',
+                'skipped']))
+        if (self.hash_cache):
+            self.hash_cache.commit()
+
+        ret = dict(status='error' if any(
+            tally['errors'] for tally in tallies) else 'ok', results=results)
+        if (budget):
+            ret['coverage'] = round(budget.coverage(), 1)
+            Syslog.logger.info('VERIFY: budget=%s cycle=%d coverage=%.1f%%' %
+                               (Config.verify_budget, Config.verify_cycle,
+                                ret['coverage']))
+        return ret
+
+    @staticmethod
+    def _verify_files(manifest_file, tally):
+        """Read a manifest's checksummed files, or at the metadata verify
+        level all of its entries of any type, looking up their catalog
+        entries a block at a time
+
+        Args:
+            manifest_file (str): path of manifest
+            tally (dict):        counters of the manifest's saveset
+        Yields:
+            tuple: ManifestEntry and catalog row of each file, starting
+                   from the position of the saveset's progress cursor
+        """
+        progress = tally['progress']
+        content = Config.verify_level == 'content'
+        entries = (entry for entry in Manifest(manifest_file).entries(
+            start=progress.position if progress else 0)
+            if not content or (
+                entry.type == 'f' and entry.has_sum and entry.size > 0))
+        while True:
+            block = list(itertools.islice(entries, Config.lookup_batch))
+            if (not block):
+                break
+            if (progress):
+                for entry in block:
+                    progress.add(entry)
+            rows = tally['catalog'].get_sums(
+                [entry.file_id for entry in block])
+            for entry in block:
+                if (entry.file_id not in rows):
+                    Actions._verify_failed(
+                        tally, 'missing', 'action=verify id=%d msg=not found'
+                        % entry.file_id, id=entry.file_id)
+                    tally['missing'] += 1
+                    if (progress):
+                        progress.done(entry, missing=1)
+                    continue
+                yield entry, rows[entry.file_id]
+
+    def _verify_submit(self, pool, hashers, location, file, tally):
+        """Queue the reads needed to verify a file
+
+        Args:
+            pool (obj):     concurrent.futures executor
+            hashers (obj):  queue.Queue of Hasher instances
+            location (str): saveset location under snapshot root
+            file (obj):     catalog row of file
+            tally (dict):   counters of the file's saveset
+        Returns:
+            tuple: arguments for _verify_check
+        """
+        path = self.paths.get_path(file.path_id)
+        if (Config.verify_level == 'metadata'):
+            return tally, file, path, None, pool.submit(
+                self._pool_verify, hashers, location, file, path, None)
+        hashtype = file.hashtype or self._hashtype(file.shasum)
+        merkle = hashtype.startswith(Constants.MERKLE_PREFIX)
+        if (merkle):
+            hashtype = hashtype[len(Constants.MERKLE_PREFIX):]
+        if (Config.hashtype != hashtype):
+            Config.hashtype = hashtype
+            Syslog.logger.info('action=verify hashtype=%s' % Config.hashtype)
+        filename = os.path.join(path, file.filename)
+        if (not merkle):
+            hashtypes = [hashtype]
+            if (Config.rehash and Config.rehash != hashtype):
+                hashtypes.append(Config.rehash)
+            return tally, file, path, None, pool.submit(
+                self._pool_verify, hashers, location, file, path, hashtypes)
+        # Few files are chunked, so their metadata is checked here
+        # rather than in the pool
+        try:
+            problem = self._verify_metadata(location, file, path)
+        except OSError:
+            problem = None
+        if (problem):
+            return tally, file, path, None, problem
+        chunks = tally['catalog'].get_chunks(file.id)
+        if (Hasher.merkle_root([item[2] for item in chunks],
+                               hashtype) != file.shasum):
+            self._verify_failed(
+                tally, 'bad_checksum', 'BAD CHECKSUM: action=verify '
+                'file=%s/%s msg=chunk digests do not match root=%s' % (
+                    path, file.filename, binascii.hexlify(file.shasum)),
+                id=file.id, file=os.path.join(path, file.filename),
+                error='chunk digests do not match root',
+                expected=binascii.hexlify(file.shasum).decode())
+            return tally, file, path, chunks, None
+        return tally, file, path, chunks, [pool.submit(
+            self._pool_chunk, hashers, location, filename, hashtype, offset,
+            size) for offset, size, _ in chunks]
+
+    def _pool_verify(self, hashers, location, file, path, hashtypes):
+        """Compare a file's metadata with the catalog and, if it matches,
+        hash it with whichever Hasher is free in a pool
+
+        Args:
+            hashers (obj):    queue.Queue of Hasher instances
+            location (str):   saveset location under snapshot root
+            file (obj):       catalog row of file
+            path (str):       directory of file relative to location
+            hashtypes (list): types of hash, or None to check only
+                              metadata
+        Returns:
+            str or list: description of how the file differs from the
+                         catalog, otherwise its binary digests, or None
+                         if hashtypes is None
+        Raises:
+            OS exceptions
+        """
+        problem = self._verify_metadata(location, file, path)
+        if (problem or not hashtypes):
+            return problem
+        return self._pool_digest(hashers, location, os.path.join(
+            path, file.filename), hashtypes, cached=False)
+
+    @staticmethod
+    def _verify_metadata(location, file, path):
+        """Compare a stored file's size, mode and mtime with its catalog
+        entry
+
+        Args:
+            location (str): saveset location under snapshot root
+            file (obj):     catalog row of file
+            path (str):     directory of file relative to location
+        Returns:
+            str: description of the first difference, or None
+        Raises:
+            OS exceptions other than a missing file
+        """
+        try:
+            file_stat = os.lstat(os.path.join(
+                Config.snapshot_root, location, path, file.filename))
+        except FileNotFoundError:
+            return 'file not found'
+        if (file_stat.st_size != file.size):
+            return '%s size=%d expected=%d' % (
+                'truncated' if file_stat.st_size < file.size else 'resized',
+                file_stat.st_size, file.size)
+        if (file_stat.st_mode != file.mode):
+            return 'mode=%o expected=%o' % (file_stat.st_mode, file.mode)
+        mtime = datetime.datetime.fromtimestamp(
+            file_stat.st_mtime).replace(microsecond=0)
+        if (file.mtime is not None and mtime != file.mtime):
+            return 'mtime=%s expected=%s' % (mtime, file.mtime)
+        return None
+
+    def _verify_next(self, pending, verified):
+        """Check the oldest of the pending reads, and record its outcome
+        in the progress cursor of its saveset, saving the cursor if due
 
-        return {'verify': dict(
-            status='ok' if errors == 0 else 'error',
-            results=results)}
+        Args:
+            pending (obj):   collections.deque of tuples of ManifestEntry
+                             and arguments for _verify_check
+            verified (dict): checksums of inodes found good, keyed by
+                             (dev << 64 | inode); updated if this one is
+        """
+        entry, args = pending.popleft()
+        outcome = self._verify_check(*args)
+        if (outcome == 'verified' and entry.ino is not None):
+            verified[entry.dev << 64 | entry.ino] = args[1].shasum
+        progress = args[0]['progress']
+        if (progress):
+            progress.done(entry, count=1, **{outcome: 1})
+            if (progress.due()):
+                self._verify_flush(args[0])
+                progress.save()
+                self.session.commit()
+
+    def _verify_flush(self, tally):
+        """Record the files verified so far in the ledger, and store
+        any replacement checksums computed with rehash
+
+        Args:
+            tally (dict): counters of a saveset
+        """
+        tally['catalog'].update_ledger(
+            [file_id for file_id, _ in tally['verified']], Syslog._now())
+        self.session.commit()
+        if (tally['rehashed']):
+            tally['catalog'].update_sums(tally['rehashed'], Config.rehash)
+            self.session.commit()
+            Syslog.logger.info('action=verify saveset=%s rehash=%s '
+                               'count=%d' % (tally['saveset'], Config.rehash,
+                                             len(tally['rehashed'])))
+        tally['verified'] = []
+        tally['rehashed'] = []
+
+    @staticmethod
+    def _verify_check(tally, file, path, chunks, future):
+        """Compare the result of a file's reads against its checksum,
+        or the digests of each of its chunks, and count the outcome
+
+        Args:
+            tally (dict):   counters of the file's saveset
+            file (obj):     catalog row of file
+            path (str):     directory of file relative to location
+            chunks (list):  (offset, size, digest) tuples of a file
+                            stored with a Merkle root, otherwise None
+            future (obj):   future of the result of _pool_verify, or list
+                            of futures of each chunk; None if the stored
+                            chunk digests don't match the root, or a str
+                            describing how the file differs from the
+                            catalog
+        Returns:
+            str: outcome, one of errors, skipped or verified
+        """
+        try:
+            if (chunks is None and future is not None and
+                    not isinstance(future, str)):
+                future = future.result()
+                if (future is None):
+                    # Metadata matches, and the file isn't to be read
+                    return 'verified'
+            if (isinstance(future, str)):
+                Actions._verify_failed(
+                    tally, 'bad_metadata', 'BAD METADATA: action=verify '
+                    'file=%s/%s msg=%s' % (path, file.filename, future),
+                    id=file.id, file=os.path.join(path, file.filename),
+                    error=future)
+                tally['errors'] += 1
+                return 'errors'
+            elif (future is None):
+                tally['errors'] += 1
+                return 'errors'
+            elif (chunks is not None):
+                bad = 0
+                for (offset, size, digest), item in zip(chunks, future):
+                    sha = item.result()
+                    if (sha != digest):
+                        Actions._verify_failed(
+                            tally, 'bad_checksum',
+                            'BAD CHECKSUM: action=verify file=%s/%s '
+                            'range=%d-%d expected=%s actual=%s' % (
+                                path, file.filename, offset,
+                                offset + size - 1, binascii.hexlify(digest),
+                                binascii.hexlify(sha)),
+                            id=file.id, file=os.path.join(
+                                path, file.filename),
+                            range=[offset, offset + size - 1],
+                            expected=binascii.hexlify(digest).decode(),
+                            actual=binascii.hexlify(sha).decode())
+                        bad += 1
+                if (bad):
+                    tally['errors'] += 1
+                    return 'errors'
+                tally['verified'].append((file.id, file.size))
+            else:
+                digests = future
+                sha = digests[0]
+                if (sha == file.shasum):
+                    tally['verified'].append((file.id, file.size))
+                if (sha == file.shasum and len(digests) > 1):
+                    tally['rehashed'].append((file.id, digests[1]))
+                elif (sha != file.shasum):
+                    Actions._verify_failed(
+                        tally, 'bad_checksum',
+                        'BAD CHECKSUM: action=verify file=%s/%s '
+                        'expected=%s actual=%s' %
+                        (path, file.filename,
+                         binascii.hexlify(file.shasum),
+                         binascii.hexlify(sha)),
+                        id=file.id, file=os.path.join(path, file.filename),
+                        expected=binascii.hexlify(file.shasum).decode(),
+                        actual=binascii.hexlify(sha).decode())
+                    tally['errors'] += 1
+                    return 'errors'
+        except Exception as ex:
+            Actions._verify_failed(
+                tally, 'unreadable', 'sha(%s): %s' % (file.filename, str(ex)),
+                id=file.id, file=os.path.join(path, file.filename),
+                error=str(ex))
+            tally['skipped'] += 1
+            return 'skipped'
+        return 'verified'
+
+    @staticmethod
+    def _verify_failed(tally, outcome, msg, **fields):
+        """Report a file that failed verification: as a record of the
+        verify report if one is being written, otherwise in the log
+
+        Args:
+            tally (dict):  counters of the file's saveset
+            outcome (str): bad_checksum, bad_metadata, missing or
+                           unreadable
+            msg (str):     log message
+            fields (dict): attributes of the file for the report
+        """
+        if (tally['report']):
+            tally['report'].write(dict(
+                fields, saveset=tally['saveset'], outcome=outcome))
+        elif (outcome == 'unreadable'):
+            Syslog.logger.debug(msg)
+        else:
+            Syslog.logger.warn(msg)
 
     def schema_update(self):
         """Examines the Alembic schema version and performs database
@@ -661,13 +1362,7 @@ class Actions(object):
         Raises:
             OS exceptions
         """
-        with open(file, 'rb') as f:
-            if (hashtype == 'md5'):
-                return hashlib.md5(f.read()).digest()
-            elif (hashtype == 'sha256'):
-                return hashlib.sha256(f.read()).digest()
-            elif (hashtype == 'sha512'):
-                return hashlib.sha512(f.read()).digest()
+        return Hasher().digest(file, hashtype)
 
     @staticmethod
     def _hashtype(shasum):
@@ -691,6 +1386,52 @@ class Actions(object):
             Syslog.logger.error(msg)
             raise RuntimeError(msg)
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _owner(uid):
+        """Look up user name of a uid, caching results for the run
+
+        Args:
+            uid (int): numeric user id
+        Returns:
+            str: user name, or None if uid is not in passwd
+        """
+        try:
+            return pwd.getpwuid(uid).pw_name
+        except KeyError:
+            return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _group(gid):
+        """Look up group name of a gid, caching results for the run
+
+        Args:
+            gid (int): numeric group id
+        Returns:
+            str: group name, or None if gid is not in group file
+        """
+        try:
+            return grp.getgrgid(gid).gr_name
+        except KeyError:
+            return None
+
+    @staticmethod
+    def _sparseness(file_stat):
+        """Fraction of a regular file's size that is allocated on disk
+
+        Args:
+            file_stat (obj): os.stat_result of the file
+        Returns:
+            float: 1 for a fully-allocated file, smaller for one with
+                   holes; files within a single block count as 1
+        """
+        if (not stat.S_ISREG(file_stat.st_mode) or
+                file_stat.st_size <= file_stat.st_blksize):
+            return 1
+        return min(1.0, float(file_stat.st_blocks * 512) /
+                   file_stat.st_size)
+
     @staticmethod
     def _filetype(mode):
         """Determine file type given the stat mode bits
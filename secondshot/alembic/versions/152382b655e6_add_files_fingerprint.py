@@ -0,0 +1,67 @@
+"""add files fingerprint
+
+Revision ID: 152382b655e6
+Revises: 8bb4d9dbc250
+Create Date: 2026-10-17 10:41:07.562910
+
+"""
+from alembic import op
+import hashlib
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '152382b655e6'
+down_revision = '8bb4d9dbc250'
+branch_labels = None
+depends_on = None
+
+BATCH = 10000
+
+
+def _fingerprint(filename, path_id, mode, size, mtime, uid, gid):
+    # Must match Catalog.fingerprint as of this revision
+    if (not isinstance(mtime, str)):
+        mtime = mtime.strftime('%Y-%m-%d %H:%M:%S')
+    return hashlib.blake2b('\0'.join([
+        filename, str(path_id), str(mode), str(size), mtime, str(uid),
+        str(gid)]).encode('utf8', 'surrogateescape'),
+        digest_size=16).digest()
+
+
+def upgrade():
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.VARBINARY(length=16),
+                                      nullable=True))
+
+    conn = op.get_bind()
+    last = 0
+    while True:
+        rows = conn.execute(sa.text(
+            'SELECT id, filename, path_id, mode, size, mtime, uid, gid '
+            'FROM files WHERE id > :last ORDER BY id LIMIT %d' % BATCH),
+            last=last).fetchall()
+        if (not rows):
+            break
+        conn.execute(sa.text(
+            'UPDATE files SET fingerprint=:fingerprint WHERE id=:file_id'),
+            [dict(file_id=row[0], fingerprint=_fingerprint(*row[1:]))
+             for row in rows])
+        last = rows[-1][0]
+
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.alter_column('fingerprint',
+                              existing_type=sa.VARBINARY(length=16),
+                              nullable=False)
+        batch_op.create_index('index5', ['host_id', 'fingerprint'],
+                              unique=True)
+        batch_op.drop_index('index3')
+
+
+def downgrade():
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.create_index('index3', [
+            'filename', 'path_id', 'host_id', 'mode', 'size', 'mtime', 'uid',
+            'gid'], unique=True)
+        batch_op.drop_index('index5')
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,40 @@
+"""add cursors table
+
+Revision ID: 5f83b1e9a4c6
+Revises: c38f05d2e617
+Create Date: 2026-10-17 19:12:08.517302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f83b1e9a4c6'
+down_revision = 'c38f05d2e617'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cursors',
+        sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
+        sa.Column('saveset_id', sa.INTEGER(), nullable=False),
+        sa.Column('action', sa.String(length=16), nullable=False),
+        sa.Column('position', sa.BIGINT(), nullable=False),
+        sa.Column('counters', sa.String(length=1023), nullable=False),
+        sa.Column('updated', sa.TIMESTAMP(), nullable=False,
+                  server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['saveset_id'], [u'savesets.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id')
+    )
+    op.create_index('index8', 'cursors', ['saveset_id', 'action'],
+                    unique=True)
+
+
+def downgrade():
+    op.drop_index('index8', table_name='cursors')
+    op.drop_table('cursors')
@@ -0,0 +1,34 @@
+"""add files hashtype
+
+Revision ID: 611355432ba1
+Revises: 152382b655e6
+Create Date: 2026-10-17 14:02:51.318722
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '611355432ba1'
+down_revision = '152382b655e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hashtype', sa.String(length=16),
+                                      nullable=True))
+
+    # Digests stored so far were identified by length alone
+    for hashtype, length in [('md5', 16), ('sha256', 32), ('sha512', 64)]:
+        op.execute(sa.text(
+            'UPDATE files SET hashtype=:hashtype WHERE shasum IS NOT NULL '
+            'AND LENGTH(shasum)=:length').bindparams(
+                hashtype=hashtype, length=length))
+
+
+def downgrade():
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_column('hashtype')
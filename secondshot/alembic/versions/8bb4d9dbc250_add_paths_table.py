@@ -0,0 +1,75 @@
+"""add paths table
+
+Revision ID: 8bb4d9dbc250
+Revises: 6cf114485e53
+Create Date: 2026-10-17 09:12:40.318245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8bb4d9dbc250'
+down_revision = '6cf114485e53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'paths',
+        sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
+        sa.Column('path', sa.String(length=1023), nullable=False),
+        sa.Column('created', sa.TIMESTAMP(), server_default=sa.func.now(),
+                  nullable=False),
+        sa.Column('host_id', sa.INTEGER(), nullable=False),
+        sa.ForeignKeyConstraint(['host_id'], [u'hosts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id')
+    )
+    op.create_index('index4', 'paths', ['host_id', 'path'], unique=True)
+
+    # Backfill one paths row for each distinct directory, then point
+    # each files row at it
+    op.execute('INSERT INTO paths (path, host_id) '
+               'SELECT DISTINCT path, host_id FROM files')
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path_id', sa.INTEGER(),
+                                      nullable=True))
+    if (op.get_bind().dialect.name == 'mysql'):
+        op.execute('UPDATE files JOIN paths ON paths.path=files.path AND '
+                   'paths.host_id=files.host_id SET files.path_id=paths.id')
+    else:
+        op.execute('UPDATE files SET path_id=(SELECT id FROM paths WHERE '
+                   'paths.path=files.path AND paths.host_id=files.host_id)')
+
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_index('index3')
+        batch_op.alter_column('path_id', existing_type=sa.INTEGER(),
+                              nullable=False)
+        batch_op.create_foreign_key('files_ibfk_2', 'paths', ['path_id'],
+                                    ['id'])
+        batch_op.create_index('index3', [
+            'filename', 'path_id', 'host_id', 'mode', 'size', 'mtime', 'uid',
+            'gid'], unique=True)
+        batch_op.drop_column('path')
+
+
+def downgrade():
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('path', sa.String(length=1023),
+                                      nullable=True))
+    op.execute('UPDATE files SET path=(SELECT path FROM paths WHERE '
+               'paths.id=files.path_id)')
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_index('index3')
+        batch_op.drop_constraint('files_ibfk_2', type_='foreignkey')
+        batch_op.alter_column('path', existing_type=sa.String(length=1023),
+                              nullable=False)
+        batch_op.create_index('index3', [
+            'filename', 'path', 'host_id', 'mode', 'size', 'mtime', 'uid',
+            'gid'], unique=True)
+        batch_op.drop_column('path_id')
+    op.drop_index('index4', table_name='paths')
+    op.drop_table('paths')
@@ -0,0 +1,39 @@
+"""add chunks table
+
+Revision ID: 9d1e4a7c5b20
+Revises: 611355432ba1
+Create Date: 2026-10-17 16:41:07.529113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+
+# revision identifiers, used by Alembic.
+revision = '9d1e4a7c5b20'
+down_revision = '611355432ba1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'chunks',
+        sa.Column('id', sa.BIGINT().with_variant(sqlite.INTEGER(), 'sqlite'),
+                  autoincrement=True, nullable=False),
+        sa.Column('file_id', sa.BIGINT(), nullable=False),
+        sa.Column('offset', sa.BIGINT(), nullable=False),
+        sa.Column('size', sa.BIGINT(), nullable=False),
+        sa.Column('shasum', sa.VARBINARY(length=64), nullable=False),
+        sa.ForeignKeyConstraint(['file_id'], [u'files.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id')
+    )
+    op.create_index('index6', 'chunks', ['file_id', 'offset'], unique=True)
+
+
+def downgrade():
+    op.drop_index('index6', table_name='chunks')
+    op.drop_table('chunks')
@@ -0,0 +1,37 @@
+"""add ledger table
+
+Revision ID: c38f05d2e617
+Revises: 9d1e4a7c5b20
+Create Date: 2026-10-17 17:35:52.104683
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+
+
+# revision identifiers, used by Alembic.
+revision = 'c38f05d2e617'
+down_revision = '9d1e4a7c5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ledger',
+        sa.Column('id', sa.BIGINT().with_variant(sqlite.INTEGER(), 'sqlite'),
+                  autoincrement=True, nullable=False),
+        sa.Column('file_id', sa.BIGINT(), nullable=False),
+        sa.Column('verified', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['file_id'], [u'files.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('id')
+    )
+    op.create_index('index7', 'ledger', ['file_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('index7', table_name='ledger')
+    op.drop_table('ledger')
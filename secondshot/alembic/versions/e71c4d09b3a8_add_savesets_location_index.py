@@ -0,0 +1,24 @@
+"""add savesets location index
+
+Revision ID: e71c4d09b3a8
+Revises: 5f83b1e9a4c6
+Create Date: 2026-10-17 20:41:37.268915
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71c4d09b3a8'
+down_revision = '5f83b1e9a4c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('index9', 'savesets', ['backup_host_id', 'location'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('index9', table_name='savesets')
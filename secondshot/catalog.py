@@ -0,0 +1,394 @@
+"""catalog
+
+Set-based operations on the files catalog
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import binascii
+import hashlib
+import sqlalchemy.exc
+from sqlalchemy import and_, bindparam, select, text
+import time
+
+from secondshot.constants import Constants
+from secondshot.models import Chunk, File, Ledger, Path
+from secondshot.syslogger import Syslog
+
+
+class Catalog(object):
+
+    # Columns covered by the fingerprint, which with host_id is the
+    # unique key of the files table
+    KEY_COLUMNS = ('filename', 'path_id', 'mode', 'size', 'mtime', 'uid',
+                   'gid')
+
+    def __init__(self, session, engine, host_id, time_fmt):
+        """Bind to a database session for a single host
+
+        Args:
+            session (obj):  sqlalchemy session
+            engine (obj):   sqlalchemy engine
+            host_id (int):  record ID of host whose files are cataloged
+            time_fmt (str): strftime format of timestamp columns
+        """
+        self.session = session
+        self.engine = engine
+        self.host_id = host_id
+        self.time_fmt = time_fmt
+
+    def upsert(self, records):
+        """Insert or update a batch of file records with multi-row
+        upserts, then look up ids and checksum presence for the batch
+
+        Args:
+            records (list): dicts of column values, all with the same keys
+                            including fingerprint
+        Returns:
+            list: (file_id, has_sum) tuples, in the same order as records
+        Raises:
+            sqlalchemy exceptions if retries are exhausted
+        """
+        if (not records):
+            return []
+        columns = list(records[0].keys())
+        if (self.engine.name == 'sqlite'):
+            rows = max(1, Constants.SQLITE_MAX_VARS // len(columns))
+        else:
+            rows = len(records)
+        results = []
+        for start in range(0, len(records), rows):
+            chunk = records[start:start + rows]
+            self._execute_upsert(columns, chunk)
+            results += self._lookup(chunk)
+        return results
+
+    def _execute_upsert(self, columns, records):
+        """Issue a single multi-row upsert statement
+
+        Args:
+            columns (list): column names
+            records (list): dicts of column values
+        """
+        params = {}
+        values = []
+        for row, record in enumerate(records):
+            names = []
+            for column in columns:
+                names.append(':%s_%d' % (column, row))
+                params['%s_%d' % (column, row)] = record[column]
+            values.append('(%s)' % ','.join(names))
+        if (self.engine.name == 'mysql'):
+            conflict = (u' ON DUPLICATE KEY UPDATE owner=VALUES(owner),'
+                        u'grp=VALUES(grp),sparseness=VALUES(sparseness),'
+                        u'last_backup=VALUES(last_backup)')
+            if ('shasum' in columns):
+                # Keep any existing checksum and its hashtype
+                conflict += (u',hashtype=IF(shasum IS NULL,VALUES(hashtype),'
+                             u'hashtype),shasum=COALESCE(shasum,'
+                             u'VALUES(shasum))')
+        else:
+            conflict = (u' ON CONFLICT (host_id,fingerprint) DO UPDATE SET '
+                        u'owner=excluded.owner,grp=excluded.grp,'
+                        u'sparseness=excluded.sparseness,'
+                        u'last_backup=excluded.last_backup')
+            if ('shasum' in columns):
+                conflict += (u',hashtype=CASE WHEN shasum IS NULL THEN '
+                             u'excluded.hashtype ELSE hashtype END,'
+                             u'shasum=COALESCE(shasum,excluded.shasum)')
+        statement = text(u'INSERT INTO files (%s) VALUES %s%s' % (
+            ','.join(columns), ','.join(values), conflict))
+
+        for retry in range(4):
+            try:
+                self.session.execute(statement, params)
+                return
+            except sqlalchemy.exc.OperationalError as ex:
+                Syslog.logger.warn('action=upsert rows=%d msg=%s' %
+                                   (len(records), str(ex)))
+                if (retry == 3):
+                    raise
+                if ('Deadlock found' in str(ex)):
+                    time.sleep((retry + 1) * 10)
+                else:
+                    time.sleep(1)
+
+    def _lookup(self, records):
+        """Fetch ids and checksum presence for records just upserted
+
+        Args:
+            records (list): dicts of column values
+        Returns:
+            list: (file_id, has_sum) tuples, in the same order as records
+        Raises:
+            RuntimeError: if a record is not found
+        """
+        files = File.__table__
+        query = select([files.c.fingerprint, files.c.id,
+                        files.c.shasum.isnot(None)]).where(and_(
+                            files.c.host_id == self.host_id,
+                            files.c.fingerprint.in_(
+                                [item['fingerprint'] for item in records])))
+        found = {}
+        for row in self.session.execute(query):
+            found[bytes(row[0])] = (row[1], bool(row[2]))
+        try:
+            return [found[record['fingerprint']] for record in records]
+        except KeyError as ex:
+            raise RuntimeError('action=upsert record not found key=%s' %
+                               binascii.hexlify(ex.args[0]))
+
+    def get_names(self, file_ids):
+        """Look up directory and filename of a set of files
+
+        Args:
+            file_ids (list): record IDs in files table
+        Returns:
+            dict: (path_id, filename) tuples keyed by file ID
+        """
+        files = File.__table__
+        rows = (Constants.SQLITE_MAX_VARS if self.engine.name == 'sqlite'
+                else max(1, len(file_ids)))
+        names = {}
+        for start in range(0, len(file_ids), rows):
+            for row in self.session.execute(select(
+                    [files.c.id, files.c.path_id, files.c.filename]).where(
+                        files.c.id.in_(file_ids[start:start + rows]))):
+                names[row[0]] = (row[1], row[2])
+        return names
+
+    def get_sums(self, file_ids):
+        """Look up location, checksum and last verification of a set
+        of files
+
+        Args:
+            file_ids (list): record IDs in files table
+        Returns:
+            dict: rows with id, path_id, filename, mode, size, mtime,
+                  shasum, hashtype and verified attributes, keyed by
+                  file ID
+        """
+        files = File.__table__
+        ledger = Ledger.__table__
+        rows = (Constants.SQLITE_MAX_VARS if self.engine.name == 'sqlite'
+                else max(1, len(file_ids)))
+        sums = {}
+        for start in range(0, len(file_ids), rows):
+            for row in self.session.execute(select(
+                    [files.c.id, files.c.path_id, files.c.filename,
+                     files.c.mode, files.c.size, files.c.mtime,
+                     files.c.shasum, files.c.hashtype,
+                     ledger.c.verified]).select_from(files.outerjoin(
+                         ledger, ledger.c.file_id == files.c.id)).where(
+                        files.c.id.in_(file_ids[start:start + rows]))):
+                sums[row.id] = row
+        return sums
+
+    def update_ledger(self, file_ids, verified):
+        """Record when a set of files was last verified
+
+        Args:
+            file_ids (list):     record IDs in files table
+            verified (datetime): time of verification
+        """
+        if (not file_ids):
+            return
+        if (self.engine.name == 'mysql'):
+            conflict = u' ON DUPLICATE KEY UPDATE verified=VALUES(verified)'
+        else:
+            conflict = (u' ON CONFLICT (file_id) DO UPDATE SET '
+                        u'verified=excluded.verified')
+        self.session.execute(text(
+            u'INSERT INTO ledger (file_id, verified) VALUES '
+            u'(:file_id, :verified)' + conflict),
+            [dict(file_id=file_id, verified=verified.strftime(self.time_fmt))
+             for file_id in file_ids])
+
+    def update_sums(self, sums, hashtype):
+        """Store checksums with a single executemany UPDATE
+
+        Args:
+            sums (list):    (file_id, digest) tuples
+            hashtype (str): type of hash
+        """
+        if (not sums):
+            return
+        files = File.__table__
+        self.session.execute(
+            files.update().where(files.c.id == bindparam('file_id')).values(
+                shasum=bindparam('digest'), hashtype=hashtype),
+            [dict(file_id=file_id, digest=digest)
+             for file_id, digest in sums])
+
+    def update_chunks(self, chunks):
+        """Replace the chunk digests of a set of files
+
+        Args:
+            chunks (dict): lists of (offset, size, digest) tuples, keyed
+                           by file ID
+        """
+        if (not chunks):
+            return
+        table = Chunk.__table__
+        self.session.execute(table.delete().where(
+            table.c.file_id.in_(list(chunks.keys()))))
+        self.session.execute(table.insert(), [
+            dict(file_id=file_id, offset=offset, size=size, shasum=digest)
+            for file_id, items in chunks.items()
+            for offset, size, digest in items])
+
+    def get_chunks(self, file_id):
+        """Fetch the chunk digests of a file
+
+        Args:
+            file_id (int): record ID in files table
+        Returns:
+            list: (offset, size, digest) tuples in file order
+        """
+        table = Chunk.__table__
+        return [(row[0], row[1], bytes(row[2])) for row in
+                self.session.execute(select(
+                    [table.c.offset, table.c.size, table.c.shasum]).where(
+                        table.c.file_id == file_id).order_by(
+                            table.c.offset))]
+
+    def fingerprint(self, record):
+        """Compute a fixed-width digest of a file record's key values
+
+        Args:
+            record (dict): column values, including KEY_COLUMNS
+        Returns:
+            bytes: 16-byte digest
+        """
+        filename, path_id, mode, size, mtime, uid, gid = [
+            record[column] for column in self.KEY_COLUMNS]
+        if (not isinstance(mtime, str)):
+            mtime = mtime.strftime(self.time_fmt)
+        return hashlib.blake2b('\0'.join([
+            filename, str(path_id), str(mode), str(size), mtime, str(uid),
+            str(gid)]).encode('utf8', 'surrogateescape'),
+            digest_size=16).digest()
+
+
+class FileIndex(object):
+
+    def __init__(self, catalog, max_bytes):
+        """Compact in-memory index of a host's cataloged files, keyed
+        by fingerprint
+
+        Args:
+            catalog (obj):   Catalog instance for the host
+            max_bytes (int): memory cap; rows beyond it aren't loaded
+        """
+        self.catalog = catalog
+        self.max_entries = max_bytes // Constants.INDEX_ENTRY_BYTES
+        self.entries = {}
+        self.complete = False
+
+    def load(self):
+        """Bulk-load id and checksum presence of the host's files rows,
+        up to the memory cap
+
+        Returns:
+            int: number of rows loaded
+        """
+        files = File.__table__
+        result = self.catalog.session.execute(select(
+            [files.c.fingerprint, files.c.id,
+             files.c.shasum.isnot(None)]).where(
+                 files.c.host_id == self.catalog.host_id).execution_options(
+                     stream_results=True))
+        self.complete = True
+        while True:
+            rows = result.fetchmany(Constants.MAX_INSERT)
+            if (not rows):
+                break
+            for row in rows:
+                if (len(self.entries) >= self.max_entries):
+                    self.complete = False
+                    break
+                self.entries[bytes(row[0])] = row[1] << 1 | bool(row[2])
+            if (not self.complete):
+                break
+        result.close()
+        Syslog.logger.info('action=index host_id=%d rows=%d complete=%s' % (
+            self.catalog.host_id, len(self.entries), self.complete))
+        return len(self.entries)
+
+    def get(self, record):
+        """Resolve a file record locally
+
+        Args:
+            record (dict): column values, including fingerprint
+        Returns:
+            tuple: (file_id, has_sum), or None if not in the index
+        """
+        value = self.entries.get(record['fingerprint'])
+        if (value is None):
+            return None
+        return value >> 1, bool(value & 1)
+
+
+class PathCache(object):
+
+    def __init__(self, session, engine):
+        """Per-run cache of directory ids in the paths table
+
+        Args:
+            session (obj): sqlalchemy session
+            engine (obj):  sqlalchemy engine
+        """
+        self.session = session
+        self.engine = engine
+        self.ids = {}
+        self.paths = {}
+
+    def get_id(self, host_id, path):
+        """Look up a directory's id, adding it to the paths table
+        if it's new
+
+        Args:
+            host_id (int): record ID of host
+            path (str):    directory path relative to snapshot location
+        Returns:
+            int: record ID in paths table
+        """
+        path_id = self.ids.get((host_id, path))
+        if (path_id is not None):
+            return path_id
+        paths = Path.__table__
+        query = select([paths.c.id]).where(and_(
+            paths.c.host_id == host_id, paths.c.path == path))
+        path_id = self.session.execute(query).scalar()
+        if (path_id is None):
+            if (self.engine.name == 'mysql'):
+                statement = u'INSERT IGNORE INTO paths (path, host_id)'
+                conflict = u''
+            else:
+                statement = u'INSERT INTO paths (path, host_id)'
+                conflict = u' ON CONFLICT (host_id, path) DO NOTHING'
+            self.session.execute(text(
+                statement + u' VALUES (:path, :host_id)' + conflict),
+                dict(path=path, host_id=host_id))
+            path_id = self.session.execute(query).scalar()
+        self.ids[(host_id, path)] = path_id
+        self.paths[path_id] = path
+        return path_id
+
+    def get_path(self, path_id):
+        """Look up a directory path by id
+
+        Args:
+            path_id (int): record ID in paths table
+        Returns:
+            str: directory path relative to snapshot location
+        """
+        path = self.paths.get(path_id)
+        if (path is None):
+            paths = Path.__table__
+            path = self.session.execute(select([paths.c.path]).where(
+                paths.c.id == path_id)).scalar()
+            self.paths[path_id] = path
+        return path
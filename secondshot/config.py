@@ -12,6 +12,7 @@ import sqlalchemy.exc
 import sys
 
 from secondshot.constants import Constants
+from secondshot.ledger import VerifyBudget
 from secondshot.models import ConfigTable, Host
 from secondshot.syslogger import Syslog
 
@@ -19,11 +20,25 @@ from secondshot.syslogger import Syslog
 class Config(object):
 
     autoverify = Constants.OPTS_DEFAULTS['autoverify']
+    chunk_size = int(Constants.OPTS_DEFAULTS['chunk-size'])
+    hash_workers = int(Constants.OPTS_DEFAULTS['hash-workers'])
     hashtype = Constants.OPTS_DEFAULTS['hashtype']
+    index_memory = int(Constants.OPTS_DEFAULTS['index-memory'])
+    inline_hash = False
+    io_order = Constants.OPTS_DEFAULTS['io-order']
+    lookup_batch = int(Constants.OPTS_DEFAULTS['lookup-batch'])
     manifest = Constants.OPTS_DEFAULTS['manifest']
+    manifest_format = Constants.OPTS_DEFAULTS['manifest-format']
+    rehash = None
+    report = None
+    resume = False
     rsnapshot_conf = Constants.OPTS_DEFAULTS['rsnapshot-conf']
+    scan_workers = int(Constants.OPTS_DEFAULTS['scan-workers'])
     sequence = None
     snapshot_root = Constants.SNAPSHOT_ROOT
+    verify_budget = None
+    verify_cycle = int(Constants.OPTS_DEFAULTS['verify-cycle'])
+    verify_level = Constants.OPTS_DEFAULTS['verify-level']
 
     def init_db_get_config(self, db_session, hostname):
         """Initialize db session and read host-specific entries from
@@ -163,11 +178,26 @@ class Config(object):
             Config.autoverify = False
         elif (opts['autoverify'].lower() in ['true', 'yes', 'on']):
             Config.autoverify = True
+        Config.chunk_size = int(opts['chunk-size'])
+        Config.hash_workers = int(opts['hash-workers'])
         Config.hashtype = opts['hashtype']
+        Config.index_memory = int(opts['index-memory'])
+        Config.inline_hash = opts['inline-hash'].lower() in [
+            'true', 'yes', 'on']
+        Config.io_order = opts['io-order']
+        Config.lookup_batch = int(opts['lookup-batch'])
         Config.manifest = opts['manifest']
+        Config.manifest_format = opts['manifest-format']
+        Config.rehash = opts.get('rehash')
+        Config.report = opts.get('report')
+        Config.resume = opts['resume'].lower() in ['true', 'yes', 'on']
         Config.rsnapshot_conf = opts['rsnapshot-conf']
+        Config.scan_workers = int(opts['scan-workers'])
         Config.sequence = opts['sequence'].split(',')
         Config.snapshot_root = Constants.SNAPSHOT_ROOT
+        Config.verify_budget = opts['verify-budget']
+        Config.verify_cycle = int(opts['verify-cycle'])
+        Config.verify_level = opts['verify-level']
         return opts
 
     def validate_configs(self, opts, valid_choices):
@@ -186,14 +216,38 @@ class Config(object):
                 if (value not in ['json', 'text']):
                     raise ValueError(
                         'format=%s not json or text' % value)
-            elif (keyword == 'hashtype'):
-                if (value not in ['md5', 'sha256', 'sha512']):
-                    raise ValueError(
-                        'hashtype=%s not md5, sha256 or sha512' % value)
-            elif (keyword == 'autoverify'):
+            elif (keyword in ['hashtype', 'rehash']):
+                if (value is not None and value not in Constants.HASHTYPES):
+                    raise ValueError('%s=%s not one of %s' % (
+                        keyword, value, ', '.join(Constants.HASHTYPES)))
+            elif (keyword in ['autoverify', 'inline-hash', 'resume']):
                 if (value not in ['false', 'no', 'off', 'true', 'yes', 'on']):
                     raise ValueError(
-                        'autoverify=%s invalid boolean value' % value)
+                        '%s=%s invalid boolean value' % (keyword, value))
+            elif (keyword == 'io-order'):
+                if (value not in ['inode', 'manifest', 'physical']):
+                    raise ValueError(
+                        'io-order=%s not inode, manifest or physical' % value)
+            elif (keyword == 'manifest-format'):
+                if (value not in ['binary', 'csv']):
+                    raise ValueError(
+                        'manifest-format=%s not binary or csv' % value)
+            elif (keyword in ['chunk-size', 'index-memory']):
+                if (not str(value).isdigit()):
+                    raise ValueError(
+                        '%s=%s must be an integer' % (keyword, value))
+            elif (keyword == 'verify-level'):
+                if (value not in ['content', 'metadata']):
+                    raise ValueError(
+                        'verify-level=%s not content or metadata' % value)
+            elif (keyword == 'verify-budget'):
+                if (value is not None):
+                    VerifyBudget.parse(value)
+            elif (keyword in ['hash-workers', 'lookup-batch',
+                              'scan-workers', 'verify-cycle']):
+                if (not str(value).isdigit() or int(value) < 1):
+                    raise ValueError(
+                        '%s=%s must be a positive integer' % (keyword, value))
 
             if (keyword not in valid_choices):
                 raise ValueError(
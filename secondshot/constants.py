@@ -9,14 +9,25 @@ license: lgpl-2.1
 
 
 class Constants(object):
+    CURSOR_INTERVAL = 60
     DBPASS_FILE = '/run/secrets/secondshot-db-password'
     DBFILE_PATH = '/metadata'
-    DBOPTS_ALLOW = ['autoverify', 'hashtype', 'host', 'rsnapshot-conf',
-                    'volume']
+    DBOPTS_ALLOW = ['autoverify', 'chunk-size', 'hash-workers', 'hashtype',
+                    'host', 'index-memory', 'inline-hash', 'io-order',
+                    'lookup-batch', 'manifest-format', 'rsnapshot-conf',
+                    'scan-workers', 'verify-budget', 'verify-cycle',
+                    'verify-level', 'volume']
     DEFAULT_VOLUME = 'backup'
+    HASH_BUFFER_SIZE = 1048576
+    HASH_CACHE = '.secondshot-hashcache'
+    HASHTYPES = ['blake2b', 'blake2s', 'md5', 'sha256', 'sha512']
+    INDEX_ENTRY_BYTES = 140
+    IO_WINDOW = 2000
     MAX_INSERT = 2000
+    MERKLE_PREFIX = 'merkle-'
     OPTS_DEFAULTS = {
         'autoverify': 'yes',
+        'chunk-size': '0',
         'dbhost': 'db00',
         'dbname': 'secondshot',
         'dbpass': None,
@@ -24,8 +35,22 @@ class Constants(object):
         'dbtype': 'sqlite',
         'dbuser': 'bkp',
         'db-url': None,
+        'hash-workers': '1',
         'hashtype': 'md5',
+        'index-memory': '0',
+        'inline-hash': 'no',
+        'io-order': 'physical',
+        'lookup-batch': '1000',
         'manifest': '.snapshot-manifest',
-        'rsnapshot-conf': '/etc/backup-daily.conf'}
+        'manifest-format': 'binary',
+        'resume': 'no',
+        'rsnapshot-conf': '/etc/backup-daily.conf',
+        'scan-workers': '1',
+        'verify-budget': None,
+        'verify-cycle': '30',
+        'verify-level': 'content'}
+    SCAN_QUEUE_DEPTH = 64
     SNAPSHOT_ROOT = '/backups'
+    SQLITE_MAX_VARS = 999
     SYNC_PATH = '.sync'
+    UPSERT_BATCH = 500
@@ -0,0 +1,134 @@
+"""hashcache
+
+Persistent per-inode cache of file digests
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from secondshot.syslogger import Syslog
+
+
+class HashCache(object):
+
+    SCHEMA = (u'CREATE TABLE IF NOT EXISTS hashes ('
+              u'dev INTEGER NOT NULL, ino INTEGER NOT NULL, '
+              u'hashtype TEXT NOT NULL, size INTEGER NOT NULL, '
+              u'mtime INTEGER NOT NULL, ctime INTEGER NOT NULL, '
+              u'digest BLOB NOT NULL, path TEXT NOT NULL, '
+              u'run INTEGER NOT NULL, PRIMARY KEY (dev, ino, hashtype))')
+
+    def __init__(self, filename):
+        """Open or create a cache of digests keyed by device and inode,
+        so content hard-linked into several savesets is read once. An
+        entry is valid only while size, mtime and ctime are unchanged.
+        Methods may be called from multiple threads.
+
+        Args:
+            filename (str): path of sqlite database file
+        """
+        self.filename = filename
+        self.run = time.time_ns()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute(self.SCHEMA)
+        self.conn.commit()
+
+    def get(self, stat, hashtype, this_run=False):
+        """Look up the digest of a file
+
+        Args:
+            stat (obj):      os.stat_result of the file
+            hashtype (str):  type of hash
+            this_run (bool): only accept a digest computed by this
+                             instance, not carried over from a prior run
+        Returns:
+            bytes: digest, or None if not cached
+        """
+        with self.lock:
+            row = self.conn.execute(
+                u'SELECT size, mtime, ctime, digest, run FROM hashes '
+                u'WHERE dev=? AND ino=? AND hashtype=?',
+                (self._signed(stat.st_dev), self._signed(stat.st_ino),
+                 hashtype)).fetchone()
+            if (row and row[:3] == (stat.st_size, stat.st_mtime_ns,
+                                    stat.st_ctime_ns) and
+                    (not this_run or row[4] == self.run)):
+                self.hits += 1
+                return row[3]
+            self.misses += 1
+            return None
+
+    def put(self, stat, hashtype, digest, path):
+        """Store the digest of a file
+
+        Args:
+            stat (obj):     os.stat_result of the file, taken before reading
+            hashtype (str): type of hash
+            digest (bytes): binary digest
+            path (str):     path of the file relative to its saveset location
+        """
+        with self.lock:
+            self.conn.execute(
+                u'INSERT OR REPLACE INTO hashes (dev, ino, hashtype, size, '
+                u'mtime, ctime, digest, path, run) '
+                u'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (self._signed(stat.st_dev), self._signed(stat.st_ino),
+                 hashtype, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns,
+                 digest, path, self.run))
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def evict(self, locations):
+        """Remove entries for inodes that no longer exist under any of
+        the given saveset locations
+
+        Args:
+            locations (list): full paths of saveset locations, most
+                              recent first
+        Returns:
+            int: number of entries removed
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                u'SELECT dev, ino, path FROM hashes').fetchall()
+        stale = []
+        for dev, ino, path in rows:
+            for location in locations:
+                try:
+                    stat = os.lstat(os.path.join(location, path))
+                except OSError:
+                    continue
+                if (self._signed(stat.st_dev) == dev and
+                        self._signed(stat.st_ino) == ino):
+                    break
+            else:
+                stale.append((dev, ino))
+        with self.lock:
+            self.conn.executemany(
+                u'DELETE FROM hashes WHERE dev=? AND ino=?', stale)
+            self.conn.commit()
+        Syslog.logger.info('action=evict cache=%s entries=%d removed=%d' % (
+            self.filename, len(rows), len(stale)))
+        return len(stale)
+
+    @staticmethod
+    def _signed(value):
+        """Map an unsigned 64-bit device or inode number into sqlite's
+        signed INTEGER range"""
+        return value - (1 << 64) if value >= 1 << 63 else value
@@ -0,0 +1,186 @@
+"""hasher
+
+Streaming file-hash engine
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import errno
+import hashlib
+import os
+import time
+
+from secondshot.constants import Constants
+
+
+class Hasher(object):
+
+    def __init__(self, bufsize=Constants.HASH_BUFFER_SIZE):
+        """Reusable file hasher; reads each file in fixed-size chunks
+        into a single buffer, so memory use doesn't grow with file
+        size. Holes in sparse files aren't read; bytes counts what was
+        read from disk and holes what was skipped. An instance is not
+        thread-safe.
+
+        Args:
+            bufsize (int): size of read buffer in bytes
+        """
+        self.buffer = bytearray(bufsize)
+        self.view = memoryview(self.buffer)
+        self.zeros = None
+        self.files = 0
+        self.bytes = 0
+        self.holes = 0
+        self.seconds = 0.0
+
+    def digest(self, filename, hashtype):
+        """Read a file and return its hash
+
+        Args:
+            filename (str): name of file
+            hashtype (str): type of hash, as named by hashlib
+        Returns:
+            bytes: binary digest
+        Raises:
+            OS exceptions
+        """
+        return self.digests(filename, [hashtype])[0]
+
+    def digests(self, filename, hashtypes):
+        """Read a file once, computing one or more hashes of it
+
+        Args:
+            filename (str):  name of file
+            hashtypes (list): types of hash, as named by hashlib
+        Returns:
+            list: binary digests, in the same order as hashtypes
+        Raises:
+            OS exceptions
+        """
+        start = time.monotonic()
+        hashes = [hashlib.new(hashtype) for hashtype in hashtypes]
+        with open(filename, 'rb', buffering=0) as f:
+            if (hasattr(os, 'posix_fadvise')):
+                os.posix_fadvise(f.fileno(), 0, 0,
+                                 os.POSIX_FADV_SEQUENTIAL)
+            self._feed(f, hashes, 0, None)
+        self.files += 1
+        self.seconds += time.monotonic() - start
+        return [hash.digest() for hash in hashes]
+
+    def digest_range(self, filename, hashtype, offset, length):
+        """Hash one byte range of a file, e.g. a chunk of a large file
+        being hashed in parallel by several instances
+
+        Args:
+            filename (str): name of file
+            hashtype (str): type of hash, as named by hashlib
+            offset (int):   starting byte
+            length (int):   number of bytes
+        Returns:
+            bytes: binary digest
+        Raises:
+            OS exceptions
+        """
+        start = time.monotonic()
+        hash = hashlib.new(hashtype)
+        with open(filename, 'rb', buffering=0) as f:
+            if (hasattr(os, 'posix_fadvise')):
+                os.posix_fadvise(f.fileno(), offset, length,
+                                 os.POSIX_FADV_SEQUENTIAL)
+            self._feed(f, [hash], offset, length)
+        self.seconds += time.monotonic() - start
+        return hash.digest()
+
+    def _feed(self, f, hashes, offset, length):
+        """Update hashes with a byte range of an open file. If the file
+        has holes, they are found with SEEK_DATA / SEEK_HOLE and fed
+        as runs of zeros without being read.
+
+        Args:
+            f (obj):       file opened in unbuffered binary mode
+            hashes (list): hashlib objects to update
+            offset (int):  starting byte
+            length (int):  number of bytes, or None to read to the end
+        """
+        fd = f.fileno()
+        stat = os.fstat(fd)
+        end = stat.st_size if length is None else min(
+            offset + length, stat.st_size)
+        sparse = (hasattr(os, 'SEEK_DATA') and
+                  stat.st_blocks * 512 < stat.st_size)
+        position = offset
+        while position < end:
+            data_end = end
+            if (sparse):
+                try:
+                    data = min(os.lseek(fd, position, os.SEEK_DATA), end)
+                    data_end = min(os.lseek(fd, data, os.SEEK_HOLE), end)
+                except OSError as ex:
+                    if (ex.errno == errno.ENXIO):
+                        # Only a hole remains beyond position
+                        (data, data_end) = (end, end)
+                    else:
+                        (sparse, data) = (False, position)
+                if (data > position):
+                    self._feed_zeros(hashes, data - position)
+                    position = data
+                    continue
+            f.seek(position)
+            while position < data_end:
+                numbytes = f.readinto(self.view[:min(
+                    data_end - position, len(self.buffer))])
+                if (not numbytes):
+                    # File was truncated while being read
+                    return
+                for hash in hashes:
+                    hash.update(self.view[:numbytes])
+                self.bytes += numbytes
+                position += numbytes
+
+    def _feed_zeros(self, hashes, length):
+        """Update hashes with a run of zero bytes standing in for a hole
+
+        Args:
+            hashes (list): hashlib objects to update
+            length (int):  number of bytes
+        """
+        if (self.zeros is None):
+            self.zeros = memoryview(bytes(len(self.buffer)))
+        self.holes += length
+        while length > 0:
+            numbytes = min(length, len(self.zeros))
+            for hash in hashes:
+                hash.update(self.zeros[:numbytes])
+            length -= numbytes
+
+    @staticmethod
+    def merkle_root(digests, hashtype):
+        """Combine chunk digests pairwise, level by level, into a
+        single root digest; an odd digest at the end of a level is
+        carried up unchanged
+
+        Args:
+            digests (list): binary digests of consecutive chunks
+            hashtype (str): type of hash, as named by hashlib
+        Returns:
+            bytes: binary digest
+        """
+        level = list(digests) or [hashlib.new(hashtype).digest()]
+        while len(level) > 1:
+            level = [hashlib.new(hashtype, b''.join(
+                level[item:item + 2])).digest() if item + 1 < len(level)
+                else level[item] for item in range(0, len(level), 2)]
+        return level[0]
+
+    def throughput(self):
+        """Average hashing rate since the instance was created
+
+        Returns:
+            float: bytes per second
+        """
+        if (self.seconds <= 0):
+            return 0.0
+        return self.bytes / self.seconds
@@ -0,0 +1,149 @@
+"""ledger
+
+Selection of files for rolling partial verification
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import re
+import time
+
+
+class VerifyBudget(object):
+
+    NEVER = 1 << 31
+    UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40,
+             's': 1, 'm': 60, 'h': 3600}
+
+    def __init__(self, amount, cycle, now):
+        """Plan a verify limited to an amount of data or time, choosing
+        the files that have gone longest since they were last verified.
+        Files verified within the cycle aren't due and are passed over.
+
+        Call add() for each candidate file, then plan(), then select()
+        for each candidate again as the verify proceeds.
+
+        Args:
+            amount (str):    bytes, with optional K/M/G/T suffix, or
+                             seconds, with s/m/h suffix
+            cycle (int):     days within which every file should be
+                             verified
+            now (datetime):  current time
+        """
+        (self.bytes, self.seconds) = self.parse(amount)
+        self.cycle = cycle
+        self.now = now
+        self.ages = {}
+        self.total = 0
+        self.fresh = 0
+        self.verified = 0
+        self.cutoff = cycle
+        self.remaining = 0
+        self.deadline = None
+
+    @classmethod
+    def parse(cls, amount):
+        """Parse a budget
+
+        Args:
+            amount (str): e.g. 500G, 4h
+        Returns:
+            tuple: (bytes, seconds), one of which is None
+        Raises:
+            ValueError: if amount is not a valid budget
+        """
+        match = re.match(r'^(\d+)([KMGTsmh]?)$', str(amount))
+        if (not match or not int(match.group(1))):
+            raise ValueError('verify-budget=%s must be bytes with optional '
+                             'K/M/G/T suffix or seconds with s/m/h' % amount)
+        value = int(match.group(1)) * cls.UNITS[match.group(2)]
+        if (match.group(2) and match.group(2) in 'smh'):
+            return None, value
+        return value, None
+
+    def age(self, verified):
+        """Days since a file was last verified
+
+        Args:
+            verified (datetime): time of last verification, or None
+        Returns:
+            int: whole days, or NEVER
+        """
+        if (verified is None):
+            return self.NEVER
+        return max(0, (self.now - verified).days)
+
+    def add(self, verified, size):
+        """Count a candidate file when sizing up the work
+
+        Args:
+            verified (datetime): time of last verification, or None
+            size (int):          file size in bytes
+        """
+        age = self.age(verified)
+        self.total += size
+        if (age < self.cycle):
+            self.fresh += size
+        else:
+            self.ages[age] = self.ages.get(age, 0) + size
+
+    def plan(self):
+        """Find the age cutoff: all due files older than it fit within
+        a byte budget, along with as many as fit of those at the cutoff.
+        A time budget takes due files in turn until the deadline."""
+
+        if (self.seconds):
+            self.deadline = time.monotonic() + self.seconds
+            return
+        self.remaining = self.bytes
+        for age in sorted(self.ages, reverse=True):
+            self.cutoff = age
+            if (self.ages[age] > self.remaining):
+                break
+            self.remaining -= self.ages[age]
+        else:
+            # Everything due fits
+            self.cutoff = self.cycle - 1
+
+    def select(self, verified, size):
+        """Decide whether to verify a file
+
+        Args:
+            verified (datetime): time of last verification, or None
+            size (int):          file size in bytes
+        Returns:
+            bool: True if file should be read
+        """
+        age = self.age(verified)
+        if (age < self.cycle):
+            return False
+        if (self.deadline is not None):
+            return not self.exhausted()
+        if (age > self.cutoff):
+            return True
+        if (age == self.cutoff and size <= self.remaining):
+            self.remaining -= size
+            return True
+        return False
+
+    def exhausted(self):
+        """Check whether a time budget has run out
+
+        Returns:
+            bool: True once past the deadline
+        """
+        return (self.deadline is not None and
+                time.monotonic() >= self.deadline)
+
+    def coverage(self):
+        """Share of candidate bytes verified within the cycle, including
+        those verified by this run
+
+        Returns:
+            float: percentage
+        """
+        if (not self.total):
+            return 100.0
+        return min(100.0, 100.0 * (self.fresh + self.verified) / self.total)
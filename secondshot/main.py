@@ -9,21 +9,41 @@ Usage:
            [--backup-host=HOST] [--host=HOST]... [--logfile=FILE]
            [--list-hosts] [--list-savesets] [--list-volumes]
            [--filter=STR] [--format=FORMAT] [--hashtype=ALGORITHM]
-           [--manifest=FILE] [--rsnapshot-conf=FILE] [--autoverify=BOOL]
+           [--manifest=FILE] [--manifest-format=FORMAT]
+           [--rsnapshot-conf=FILE] [--autoverify=BOOL]
            [--sequence=VALUES] [--volume=VOL] [--log-level=STR]
+           [--chunk-size=MB] [--hash-workers=N] [--index-memory=MB]
+           [--inline-hash=BOOL] [--io-order=ORDER] [--scan-workers=N]
            [--version] [-v]...
   secondshot --action=start --host=HOST --volume=VOL [--autoverify=BOOL]
-           [--log-level=STR] [-v]...
+           [--chunk-size=MB] [--hash-workers=N] [--index-memory=MB]
+           [--inline-hash=BOOL] [--io-order=ORDER] [--manifest-format=FORMAT]
+           [--scan-workers=N] [--log-level=STR] [-v]...
   secondshot --action=rotate --interval=INTERVAL [--logfile=FILE]
            [--log-level=STR] [--rsnapshot-conf=FILE] [-v]...
   secondshot --verify=SAVESET... [--format=FORMAT] [--hashtype=ALG]
+           [--hash-workers=N] [--io-order=ORDER] [--lookup-batch=N]
+           [--rehash=ALG] [--report=FILE] [--resume=BOOL]
+           [--verify-budget=AMOUNT] [--verify-cycle=DAYS]
+           [--verify-level=LEVEL] [--logfile=FILE] [--log-level=STR]
+           [--rsnapshot-conf=FILE] [-v]...
+  secondshot --calc-sums=SAVESET... [--format=FORMAT] [--chunk-size=MB]
+           [--hash-workers=N] [--io-order=ORDER] [--resume=BOOL]
            [--logfile=FILE] [--log-level=STR] [--rsnapshot-conf=FILE] [-v]...
+  secondshot --action=evict-cache [--logfile=FILE] [--log-level=STR]
+           [--rsnapshot-conf=FILE] [-v]...
   secondshot --action=schema-update [-v]...
   secondshot (-h | --help)
 
 Options:
-  --action=ACTION       Action to take (archive, rotate, start)
+  --action=ACTION       Action to take (archive, evict-cache, rotate,
+                        start)
   --backup-host=HOST    Hostname taking the backup (default hostname -s)
+  --calc-sums=SAVESET   Compute checksums missing from a saveset, e.g. one
+                        whose start was interrupted
+  --chunk-size=MB       Checksum files larger than this in chunks of this
+                        size, hashed in parallel and combined into a Merkle
+                        root; 0 to disable (default: 0)
   --dbhost=HOST         DB host (default: db00)
   --dbname=DB           DB name (default: secondshot)
   --dbport=PORT         DB port (default: 3306)
@@ -31,24 +51,57 @@ Options:
   --dbpass=PASS         DB password (default env variable DBPASS)
   --dbtype=TYPE         DB type, e.g. mysql+pymysql (default: sqlite)
   --db-url=URL          Full URL (alternative to above DB specifiers)
+  --hash-workers=N      Threads computing or verifying checksums
+                        (default: 1)
   --host=HOST           Source host(s) to back up
+  --index-memory=MB     Memory cap for preloading the host's catalog
+                        before inject, 0 to disable (default: 0)
+  --inline-hash=BOOL    Compute checksums of new files during inject rather
+                        than in a separate pass (default: no)
   --interval=INTERVAL   Rotation interval: e.g. hourly, daysago
+  --io-order=ORDER      Order of file reads in calc_sums and verify:
+                        manifest, inode, or physical block (default:
+                        physical)
   --list-hosts          List hosts
   --list-savesets       List savesets
   --list-volumes        List volumes
   --filter=STR          Filter to limit listing [default: *]
   --format=FORMAT       Format (text or json) [default: text]
   --logfile=FILE        Logging destination [default: /var/log/secondshot]
+  --lookup-batch=N      Manifest entries whose checksums verify fetches
+                        from the catalog per query (default: 1000)
   --log-level=STR       Syslog level debug/info/warn/none [default: info]
   --manifest=FILE       Name of manifest file [default: .secondshot-manifest]
+  --manifest-format=FORMAT  Format of new manifests, binary or csv
+                        (default: binary)
+  --rehash=ALG          During verify, also compute this algorithm's digest
+                        in the same pass, replacing checksums that match
+  --report=FILE         Write each file failing verify as a line of JSON
+                        to this file, or - for stderr, instead of logging
+                        it; a summary record follows the last
+  --resume=BOOL         Continue an interrupted verify or calc-sums from
+                        its last saved position (default: no)
   --rsnapshot-conf=FILE Path of rsnapshot's config file
                         (default: /etc/backup-daily.conf)
+  --scan-workers=N      Threads scanning directories during inject
+                        (default: 1)
   --sequence=VALUES     Sequence of retention intervals
                         [default: hourly,daysago,weeksago,monthsago,\
 semiannually,yearsago]
   --autoverify=BOOL     Verify each just-created saveset (default: yes)
-  --hashtype=ALGORITHM  Hash algorithm md5, sha256, sha512 (default: md5)
+  --hashtype=ALGORITHM  Hash algorithm blake2b, blake2s, md5, sha256 or
+                        sha512 (default: md5)
   --verify=SAVESET      Verify checksums of stored files
+  --verify-budget=AMOUNT  Verify only the files longest since their last
+                        verification, up to this many bytes (suffix K, M,
+                        G or T) or seconds (suffix s, m or h); the
+                        autoverify of --action=start reads every file
+  --verify-cycle=DAYS   With --verify-budget, skip files verified within
+                        this many days (default: 30)
+  --verify-level=LEVEL  Check only that stored files match the catalog's
+                        size, mode and mtime (metadata), or also read
+                        those that match to compare checksums (content)
+                        (default: content)
   --version             Display software version
   --volume=VOLUME       Volume for storing saveset
   -v --verbose          Verbose output
@@ -83,6 +136,8 @@ def main():
         result = obj.list_volumes()
     elif (opts['verify']):
         result = obj.verify(opts['verify'])
+    elif (opts['calc-sums']):
+        result = obj.calc_sums_savesets(opts['calc-sums'])
     elif (opts['version']):
         result = dict(version=[dict(name='secondshot %s' % __version__)])
     elif (opts['action'] == 'start'):
@@ -90,6 +145,9 @@ def main():
         status = result['start']['status']
     elif (opts['action'] == 'rotate'):
         result = obj.rotate(opts['interval'])
+    elif (opts['action'] == 'evict-cache'):
+        result = obj.evict_cache()
+        status = result['evict-cache']['status']
     elif (opts['action'] == 'schema-update'):
         result = obj.schema_update()
         status = result['status']
@@ -0,0 +1,262 @@
+"""manifest
+
+Reading and writing of saveset manifest files
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import collections
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+
+ManifestEntry = collections.namedtuple('ManifestEntry', [
+    'file_id', 'type', 'size', 'has_sum', 'dev', 'ino', 'mtime', 'mode',
+    'uid', 'gid', 'position', 'end'])
+
+
+class Manifest(object):
+
+    COLUMNS = ['file_id', 'type', 'file_size', 'has_checksum', 'device',
+               'inode', 'mtime', 'mode', 'uid', 'gid']
+    FORMATS = ['binary', 'csv']
+    # Binary format: a header of magic and record size, followed by
+    # fixed-width records of file_id, size, device, inode, mtime,
+    # mode, uid, gid, type and has_checksum flag
+    MAGIC = b'SSMANIF1'
+    HEADER = struct.Struct('<8sI4x')
+    RECORD = struct.Struct('<QqQQqIIIcc2x')
+    FLAG_OFFSET = 53
+    # Packed value of an inode index entry: file_id, size, mtime, mode,
+    # uid, gid, type, has_sum, digest of path_id and filename
+    INODE_FORMAT = struct.Struct('<QqqIIIcc16s')
+    # Entries per catalog query for names while building an inode index
+    NAME_BATCH = 1000
+    TEMP_SUFFIX = '.tmp'
+
+    def __init__(self, filename, fmt='binary'):
+        """Manifest of a saveset, in either the fixed-width binary
+        format or CSV text; older CSV savesets have only the first
+        four columns, without inode attributes
+
+        Args:
+            filename (str): path of manifest file
+            fmt (str):      format of a manifest being created
+        """
+        self.filename = filename
+        self.format = fmt
+        self.fp = None
+        self.map = None
+
+    def __iter__(self):
+        return self.entries()
+
+    def create(self):
+        """Start writing a new manifest; it replaces any existing file
+        only upon commit(), so a hard-linked copy belonging to a
+        prior saveset is left intact"""
+
+        if (self.format == 'binary'):
+            self.fp = open(self.filename + self.TEMP_SUFFIX, 'wb')
+            self.fp.write(self.HEADER.pack(self.MAGIC, self.RECORD.size))
+        else:
+            self.fp = open(self.filename + self.TEMP_SUFFIX, 'w')
+            self.fp.write(','.join(self.COLUMNS) + '\n')
+
+    def append(self, file_id, file_type, has_sum, stat):
+        """Add an entry to a manifest opened by create()
+
+        Args:
+            file_id (int):   record ID in files table
+            file_type (str): file type as returned by Actions._filetype
+            has_sum (bool):  whether catalog has a checksum for the file
+            stat (obj):      os.stat_result of the file
+        """
+        if (self.format == 'binary'):
+            self.fp.write(self.RECORD.pack(
+                file_id, stat.st_size, stat.st_dev, stat.st_ino,
+                int(stat.st_mtime), stat.st_mode, stat.st_uid, stat.st_gid,
+                file_type.encode(), b'Y' if has_sum else b'N'))
+        else:
+            self.fp.write('%d,%s,%d,%s,%d,%d,%d,%d,%d,%d\n' % (
+                file_id, file_type, stat.st_size, 'Y' if has_sum else 'N',
+                stat.st_dev, stat.st_ino, int(stat.st_mtime), stat.st_mode,
+                stat.st_uid, stat.st_gid))
+
+    def commit(self):
+        """Close a manifest opened by create() and move it into place"""
+
+        self.fp.close()
+        self.fp = None
+        os.replace(self.filename + self.TEMP_SUFFIX, self.filename)
+
+    def is_binary(self):
+        """Check the format of an existing manifest
+
+        Returns:
+            bool: True if the file starts with the binary format's magic
+        """
+        with open(self.filename, 'rb') as fp:
+            return fp.read(len(self.MAGIC)) == self.MAGIC
+
+    def entries(self, start=0):
+        """Read manifest entries
+
+        Args:
+            start (int): byte offset at which to resume reading, as
+                         given by the end field of an earlier entry;
+                         0 to read from the first entry
+        Yields:
+            ManifestEntry: fields of each entry; position is the byte
+                           offset of its has_checksum flag, and end is
+                           the offset just past the entry
+        """
+        if (self.is_binary()):
+            for entry in self._binary_entries(start):
+                yield entry
+            return
+        with open(self.filename, 'rb') as fp:
+            fp.readline()
+            if (start):
+                fp.seek(start)
+            position = fp.tell()
+            for line in fp:
+                fields = line.rstrip(b'\n').split(b',')
+                flag = position + sum(len(item) for item in fields[:3]) + 3
+                position += len(line)
+                if (len(fields) < 10):
+                    fields += [None] * (10 - len(fields))
+                yield ManifestEntry(
+                    int(fields[0]), fields[1].decode(), int(fields[2]),
+                    fields[3] == b'Y',
+                    *[int(item) if item is not None else None
+                      for item in fields[4:10]],
+                    position=flag, end=position)
+
+    def _binary_entries(self, start=0):
+        """Iterate the records of a binary manifest through mmap
+
+        Args:
+            start (int): byte offset of first record to read, or 0
+        """
+
+        with open(self.filename, 'rb') as fp:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                _, size = self.HEADER.unpack_from(data)
+                if (size != self.RECORD.size):
+                    raise ValueError('manifest=%s record size=%d unsupported'
+                                     % (self.filename, size))
+                end = len(data) - (len(data) - self.HEADER.size) % size
+                for offset in range(max(start, self.HEADER.size), end, size):
+                    (file_id, file_size, dev, ino, mtime, mode, uid, gid,
+                     file_type, has_sum) = self.RECORD.unpack_from(
+                         data, offset)
+                    yield ManifestEntry(
+                        file_id, file_type.decode(), file_size,
+                        has_sum == b'Y', dev, ino, mtime, mode, uid, gid,
+                        offset + self.FLAG_OFFSET, offset + size)
+
+    def open_update(self):
+        """Open the manifest for in-place updates of checksum flags"""
+
+        self.fp = open(self.filename, 'r+b')
+        if (self.is_binary()):
+            self.map = mmap.mmap(self.fp.fileno(), 0)
+
+    def mark(self, entry):
+        """Set the has_checksum flag of an entry
+
+        Args:
+            entry (ManifestEntry): entry as returned by entries()
+        """
+        if (self.map is not None):
+            self.map[entry.position] = ord('Y')
+        else:
+            self.fp.seek(entry.position)
+            self.fp.write(b'Y')
+
+    def close(self):
+        if (self.map is not None):
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        if (self.fp):
+            self.fp.close()
+            self.fp = None
+
+    def inode_index(self, get_names):
+        """Build an index, keyed by device and inode, of the entries in
+        this manifest. Inodes that appear more than once are left out
+        since they can't be attributed to a single file record, as are
+        entries whose file record is gone.
+
+        Args:
+            get_names (func): maps a list of file IDs to a dict of
+                              (path_id, filename) tuples keyed by file
+                              ID, e.g. Catalog.get_names
+        Returns:
+            dict: compact packed entries keyed by (dev << 64 | inode)
+        """
+        index = {}
+        if (not os.path.exists(self.filename)):
+            return index
+        entries = self.entries()
+        while True:
+            block = list(itertools.islice(entries, self.NAME_BATCH))
+            if (not block or block[0].ino is None):
+                break
+            names = get_names([entry.file_id for entry in block])
+            for entry in block:
+                key = entry.dev << 64 | entry.ino
+                if (key in index or entry.file_id not in names):
+                    index[key] = None
+                else:
+                    index[key] = self.INODE_FORMAT.pack(
+                        entry.file_id, entry.size, entry.mtime, entry.mode,
+                        entry.uid, entry.gid, entry.type.encode(),
+                        b'Y' if entry.has_sum else b'N',
+                        self.name_key(*names[entry.file_id]))
+        return index
+
+    @classmethod
+    def lookup(cls, index, stat, path_id, filename):
+        """Find an unchanged file in an inode index
+
+        Args:
+            index (dict):    index as returned by inode_index()
+            stat (obj):      os.stat_result of the file
+            path_id (int):   record ID of the file's directory
+            filename (str):  name of the file
+        Returns:
+            tuple: file_id, type and has_sum of matching prior entry,
+                   or None if the inode is new, its attributes changed
+                   or it was listed under another name
+        """
+        packed = index.get(stat.st_dev << 64 | stat.st_ino)
+        if (not packed):
+            return None
+        (file_id, size, mtime, mode, uid, gid, file_type,
+         has_sum, name) = cls.INODE_FORMAT.unpack(packed)
+        if (size != stat.st_size or mtime != int(stat.st_mtime) or
+                mode != stat.st_mode or uid != stat.st_uid or
+                gid != stat.st_gid or
+                name != cls.name_key(path_id, filename)):
+            return None
+        return file_id, file_type.decode(), has_sum == b'Y'
+
+    @staticmethod
+    def name_key(path_id, filename):
+        """Compute a fixed-width digest of a file's directory and name
+
+        Args:
+            path_id (int):  record ID of the file's directory
+            filename (str): name of the file
+        Returns:
+            bytes: 16-byte digest
+        """
+        return hashlib.blake2b(('%d\0%s' % (path_id, filename)).encode(
+            'utf8', 'surrogateescape'), digest_size=16).digest()
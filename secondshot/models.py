@@ -45,16 +45,30 @@ class Host(Base):
     created = Column(TIMESTAMP, nullable=False, server_default=func.now())
 
 
+class Path(Base):
+    __tablename__ = 'paths'
+    __table_args__ = (
+        Index('index4', 'host_id', 'path', unique=True),
+    )
+
+    id = Column(INTEGER, primary_key=True, nullable=False, unique=True,
+                autoincrement=True)
+    path = Column(String(1023), nullable=False)
+    created = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    host_id = Column(ForeignKey(u'hosts.id'), nullable=False)
+
+    host = relationship('Host')
+
+
 class File(Base):
     __tablename__ = 'files'
     __table_args__ = (
-        Index('index3', 'filename', 'path', 'host_id', 'mode', 'size', 'mtime',
-              'uid', 'gid', unique=True),
+        Index('index5', 'host_id', 'fingerprint', unique=True),
     )
 
     id = Column(BigIntId, primary_key=True, nullable=False, unique=True,
                 autoincrement=True)
-    path = Column(String(1023), nullable=False)
+    path_id = Column(ForeignKey(u'paths.id'), nullable=False)
     filename = Column(String(255), nullable=False)
     owner = Column(String(48))
     grp = Column(String(48))
@@ -68,17 +82,74 @@ class File(Base):
     links = Column(INTEGER, nullable=False, server_default=text("1"))
     sparseness = Column(Float, nullable=False, server_default=text("1"))
     shasum = Column(VARBINARY(64))
+    hashtype = Column(String(16))
     first_backup = Column(TIMESTAMP, nullable=False, server_default=func.now())
     last_backup = Column(TIMESTAMP)
+    # digest of filename, path_id, mode, size, mtime, uid, gid
+    fingerprint = Column(VARBINARY(16), nullable=False)
     # host_id = Column(ForeignKey(u'hosts.id'), primary_key=True,
     #                 nullable=False, index=True)
     host_id = Column(ForeignKey(u'hosts.id'), nullable=False, index=True)
 
+    directory = relationship('Path')
     host = relationship('Host')
 
 
+class Chunk(Base):
+    __tablename__ = 'chunks'
+    __table_args__ = (
+        Index('index6', 'file_id', 'offset', unique=True),
+    )
+
+    id = Column(BigIntId, primary_key=True, nullable=False, unique=True,
+                autoincrement=True)
+    file_id = Column(ForeignKey(u'files.id', ondelete='CASCADE'),
+                     nullable=False)
+    offset = Column(BIGINT, nullable=False)
+    size = Column(BIGINT, nullable=False)
+    shasum = Column(VARBINARY(64), nullable=False)
+
+    file = relationship('File')
+
+
+class Ledger(Base):
+    __tablename__ = 'ledger'
+    __table_args__ = (
+        Index('index7', 'file_id', unique=True),
+    )
+
+    id = Column(BigIntId, primary_key=True, nullable=False, unique=True,
+                autoincrement=True)
+    file_id = Column(ForeignKey(u'files.id', ondelete='CASCADE'),
+                     nullable=False)
+    verified = Column(TIMESTAMP, nullable=False)
+
+    file = relationship('File')
+
+
+class Cursor(Base):
+    __tablename__ = 'cursors'
+    __table_args__ = (
+        Index('index8', 'saveset_id', 'action', unique=True),
+    )
+
+    id = Column(INTEGER, primary_key=True, nullable=False, unique=True,
+                autoincrement=True)
+    saveset_id = Column(ForeignKey(u'savesets.id', ondelete='CASCADE'),
+                        nullable=False)
+    action = Column(String(16), nullable=False)
+    position = Column(BIGINT, nullable=False)
+    counters = Column(String(1023), nullable=False)
+    updated = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+    saveset = relationship('Saveset')
+
+
 class Saveset(Base):
     __tablename__ = 'savesets'
+    __table_args__ = (
+        Index('index9', 'backup_host_id', 'location'),
+    )
 
     id = Column(INTEGER, primary_key=True, nullable=False, unique=True,
                 autoincrement=True)
@@ -0,0 +1,121 @@
+"""progress
+
+Resumable progress of an action through a saveset's manifest
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import collections
+import json
+from sqlalchemy import func
+import time
+
+from secondshot.constants import Constants
+from secondshot.models import Cursor
+
+
+class Progress(object):
+
+    def __init__(self, session, saveset_id, action):
+        """Cursor of an action through a saveset's manifest, stored in
+        the catalog so that an interrupted run can pick up where it
+        stopped. Entries may finish out of order; the cursor advances
+        only past entries whose work is done, and the counters cover
+        exactly those entries, so a resumed run neither skips nor
+        double-counts any.
+
+        Call add() for each manifest entry as it's read, and done()
+        once its outcome is known.
+
+        Args:
+            session (obj):    sqlalchemy session
+            saveset_id (int): record ID of saveset
+            action (str):     calc_sums or verify
+        """
+        self.session = session
+        self.saveset_id = saveset_id
+        self.action = action
+        self.position = 0
+        self.counters = {}
+        self.outstanding = collections.OrderedDict()
+        self.saved = time.monotonic()
+
+    def load(self):
+        """Restore the cursor saved by an earlier run, if any
+
+        Returns:
+            int: manifest offset at which to resume, or 0
+        """
+        record = self.session.query(Cursor).filter_by(
+            saveset_id=self.saveset_id, action=self.action).one_or_none()
+        if (record):
+            self.position = record.position
+            self.counters = json.loads(record.counters)
+        return self.position
+
+    def add(self, entry):
+        """Track a manifest entry read for processing
+
+        Args:
+            entry (ManifestEntry): entry as returned by Manifest.entries
+        """
+        self.outstanding[entry.end] = None
+
+    def done(self, entry, **counts):
+        """Record the outcome of an entry passed to add()
+
+        Args:
+            entry (ManifestEntry): entry as returned by Manifest.entries
+            counts (dict):         amounts to add to the counters
+        """
+        if (len(self.outstanding) > 1 and
+                next(reversed(self.outstanding)) == entry.end):
+            # Fold into a finished predecessor, so that a long run of
+            # entries behind one still in progress takes no memory
+            self.outstanding.popitem()
+            end, previous = self.outstanding.popitem()
+            if (previous is None):
+                self.outstanding[end] = None
+            else:
+                for key, value in previous.items():
+                    counts[key] = counts.get(key, 0) + value
+        self.outstanding[entry.end] = counts
+        while (self.outstanding):
+            end, counts = next(iter(self.outstanding.items()))
+            if (counts is None):
+                break
+            self.outstanding.popitem(last=False)
+            self.position = end
+            for key, value in counts.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def due(self):
+        """Check whether it's time to save the cursor
+
+        Returns:
+            bool: True if CURSOR_INTERVAL seconds have passed since the
+                  last save
+        """
+        return time.monotonic() - self.saved >= Constants.CURSOR_INTERVAL
+
+    def save(self):
+        """Store the cursor; caller commits the session"""
+
+        record = self.session.query(Cursor).filter_by(
+            saveset_id=self.saveset_id, action=self.action).one_or_none()
+        if (not record):
+            record = Cursor(saveset_id=self.saveset_id, action=self.action)
+            self.session.add(record)
+        record.position = self.position
+        record.counters = json.dumps(self.counters, sort_keys=True)
+        record.updated = func.now()
+        self.saved = time.monotonic()
+
+    def clear(self):
+        """Remove the cursor once the action has finished; caller
+        commits the session"""
+
+        self.session.query(Cursor).filter_by(
+            saveset_id=self.saveset_id, action=self.action).delete()
@@ -0,0 +1,51 @@
+"""report
+
+Streaming report of verify outcomes
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import json
+import sys
+
+
+class VerifyReport(object):
+
+    def __init__(self, filename):
+        """Per-file outcomes of a verify, written as JSON Lines as they
+        occur rather than held in memory, and ending with a summary
+        record
+
+        Args:
+            filename (str): path of report file, or - for stderr, which
+                            leaves stdout to the results
+        """
+        self.filename = filename
+        self.fp = sys.stderr if filename == '-' else open(filename, 'w')
+        self.count = 0
+
+    def write(self, record):
+        """Add a record to the report
+
+        Args:
+            record (dict): attributes of a file that failed verification
+        """
+        self.fp.write(json.dumps(dict(record, record='file'),
+                                 sort_keys=True) + '\n')
+        self.count += 1
+
+    def close(self, summary):
+        """Finish the report with a summary record
+
+        Args:
+            summary (dict): results as returned by verify
+        """
+        self.fp.write(json.dumps(dict(summary, record='summary',
+                                      problems=self.count),
+                                 sort_keys=True) + '\n')
+        if (self.fp is sys.stderr):
+            self.fp.flush()
+        else:
+            self.fp.close()
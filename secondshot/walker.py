@@ -0,0 +1,200 @@
+"""walker
+
+Streaming directory-tree walker for inject
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import collections
+import errno
+import os
+import queue
+import threading
+
+from secondshot.constants import Constants
+from secondshot.syslogger import Syslog
+
+WalkEntry = collections.namedtuple('WalkEntry', ['path', 'filename', 'stat'])
+
+
+class Walker(object):
+
+    def __init__(self, top, relative_to, exclude=(), workers=1):
+        """Set up a walk of a directory tree
+
+        Args:
+            top (str):         directory at top of tree
+            relative_to (str): directory from which entry paths are relative
+            exclude (list):    filenames to leave out at any level
+            workers (int):     number of scanner threads
+        """
+        self.top = top
+        self.prefix = os.path.relpath(top, relative_to)
+        self.exclude = set(exclude)
+        self.workers = workers
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        if (self.workers > 1):
+            return self.walk_parallel()
+        return self.walk()
+
+    def walk(self):
+        """Walk the tree top-down, in the same order as os.walk
+
+        Yields:
+            WalkEntry: relative path, filename and lstat result of each
+                       non-directory entry
+        Raises:
+            OSError: if an entry can't be stat'ed for reasons other
+                     than having been removed during the walk
+        """
+        stack = [(self.top, self.prefix, self._valid(self.prefix))]
+        while stack:
+            entries, subdirs = self.scan_dir(*stack.pop())
+            for entry in entries:
+                yield entry
+            stack.extend(reversed(subdirs))
+
+    def walk_parallel(self):
+        """Walk the tree with a pool of scanner threads, each taking
+        the next unscanned directory from a shared queue. Entries are
+        passed through a bounded queue to the caller, which remains
+        the single consumer; order is not deterministic.
+
+        Yields:
+            WalkEntry: as with walk()
+        Raises:
+            OSError: as with walk(), re-raised from the scanner thread
+        """
+        dirs = queue.Queue()
+        results = queue.Queue(maxsize=Constants.SCAN_QUEUE_DEPTH)
+        stop = threading.Event()
+
+        def _put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=1)
+                    return
+                except queue.Full:
+                    pass
+
+        def _scanner():
+            while True:
+                item = dirs.get()
+                if (item is None):
+                    return
+                try:
+                    if (not stop.is_set()):
+                        entries, subdirs = self.scan_dir(*item)
+                        for subdir in subdirs:
+                            dirs.put(subdir)
+                        if (entries):
+                            _put(entries)
+                except Exception as ex:
+                    _put(ex)
+                finally:
+                    dirs.task_done()
+
+        def _monitor():
+            dirs.join()
+            for _ in range(self.workers):
+                dirs.put(None)
+            _put(None)
+
+        dirs.put((self.top, self.prefix, self._valid(self.prefix)))
+        threads = [threading.Thread(target=_scanner, daemon=True)
+                   for _ in range(self.workers)]
+        threads.append(threading.Thread(target=_monitor, daemon=True))
+        for thread in threads:
+            thread.start()
+        try:
+            for item in iter(results.get, None):
+                if (isinstance(item, Exception)):
+                    raise item
+                for entry in item:
+                    yield entry
+        finally:
+            stop.set()
+
+    def scan_dir(self, dirpath, relpath, valid=True):
+        """Read one directory, reusing the stat data cached in each
+        DirEntry rather than calling lstat again
+
+        Args:
+            dirpath (str): full path of directory
+            relpath (str): directory path relative to top of walk
+            valid (bool):  whether relpath is valid utf-8
+        Returns:
+            tuple: list of WalkEntry, list of (dirpath, relpath, valid)
+                   tuples for each subdirectory
+        """
+        (entries, subdirs) = ([], [])
+        try:
+            scan = os.scandir(dirpath)
+        except OSError as ex:
+            Syslog.logger.debug('action=inject path=%s msg=%s' %
+                                (dirpath, str(ex)))
+            return entries, subdirs
+        with scan:
+            for entry in scan:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if (is_dir):
+                    # Like os.walk, symlinks to directories are neither
+                    # descended nor returned as files
+                    if (not entry.is_symlink()):
+                        child = self._join(relpath, entry.name)
+                        subdirs.append((entry.path, child,
+                                        valid and self._valid(child)))
+                    continue
+                if (entry.name in self.exclude):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError as ex:
+                    if (ex.errno != errno.ENOENT):
+                        Syslog.logger.error(
+                            'action=inject filename=%s message=%s' %
+                            (entry.name, str(ex)))
+                        raise
+                    with self.lock:
+                        self.skipped += 1
+                    Syslog.logger.debug('action=inject path=%s filename=%s '
+                                        'msg=%s' %
+                                        (dirpath, entry.name, str(ex)))
+                    continue
+                if (not valid or not self._valid(entry.name)):
+                    with self.lock:
+                        self.skipped += 1
+                    Syslog.logger.debug(
+                        'action=inject inode=%d dev=%s msg=invalid utf-8 '
+                        'in path' % (stat.st_ino, stat.st_dev))
+                    continue
+                entries.append(WalkEntry(relpath, entry.name, stat))
+        return entries, subdirs
+
+    @staticmethod
+    def _join(relpath, name):
+        """Append a name to a relative path without normalizing"""
+        return name if relpath == '.' else relpath + '/' + name
+
+    @staticmethod
+    def _valid(name):
+        """Check that a name can be stored as utf-8
+
+        Args:
+            name (str): file or path name, possibly with surrogate escapes
+        Returns:
+            bool: False if the name contains undecodable bytes
+        """
+        try:
+            name.encode('utf8')
+        except UnicodeEncodeError:
+            return False
+        return True
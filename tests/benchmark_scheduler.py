@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark of read ordering: hashes every file under a directory in
+manifest (walk) order and in each IOScheduler order, dropping the files
+from page cache before each pass, and reports wall-clock times. Use a
+directory on a spinning-disk backup volume for meaningful results.
+
+created 17-oct-2026 by richb@instantlinux.net
+
+Usage:
+  benchmark_scheduler.py [--path=DIR] [--files=N] [--size=KB] [--passes=N]
+
+Options:
+  --path=DIR     Directory to read; if omitted, a temporary tree of
+                 files is created, written in shuffled order
+  --files=N      Number of files in a temporary tree [default: 2000]
+  --size=KB      Size of each file in a temporary tree [default: 64]
+  --passes=N     Timed passes per ordering [default: 3]
+
+license: lgpl-2.1
+"""
+
+import docopt
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from secondshot.hasher import Hasher
+from secondshot.scheduler import IOScheduler
+from secondshot.syslogger import Syslog
+from secondshot.walker import Walker
+
+
+def make_tree(path, files, size):
+    """Create files spread over subdirectories, in random order so
+    that walk order and allocation order differ"""
+
+    names = [os.path.join(path, 'dir%03d' % (item % 50), 'file%06d' % item)
+             for item in range(files)]
+    random.shuffle(names)
+    for name in names:
+        os.makedirs(os.path.dirname(name), exist_ok=True)
+        with open(name, 'wb') as f:
+            f.write(os.urandom(size * 1024))
+    os.sync()
+
+
+def drop_cache(items):
+    for _, _, filename in items:
+        with open(filename, 'rb') as f:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def timed_pass(items, order):
+    drop_cache(items)
+    hasher = Hasher()
+    start = time.monotonic()
+    for _, _, filename in IOScheduler(order).schedule(
+            items, lambda item: item):
+        hasher.digest(filename, 'md5')
+    return time.monotonic() - start
+
+
+def main():
+    opts = docopt.docopt(__doc__)
+    Syslog.logger = Syslog({'log-level': 'none', 'verbose': None,
+                            'logfile': os.devnull})
+    path = opts['--path']
+    temp = None
+    if (not path):
+        temp = path = tempfile.mkdtemp(prefix='_benchmark')
+        make_tree(path, int(opts['--files']), int(opts['--size']))
+    try:
+        items = [(entry.stat.st_dev, entry.stat.st_ino,
+                  os.path.join(path, entry.path, entry.filename))
+                 for entry in Walker(path, path)
+                 if os.path.isfile(os.path.join(
+                     path, entry.path, entry.filename))]
+        print('files=%d' % len(items))
+        for order in ['manifest', 'inode', 'physical']:
+            times = [timed_pass(items, order)
+                     for _ in range(int(opts['--passes']))]
+            print('order=%-8s best=%.3fs mean=%.3fs' % (
+                order, min(times), sum(times) / len(times)))
+    finally:
+        if (temp):
+            shutil.rmtree(temp)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,15 +9,21 @@ license: lgpl-2.1
 
 import binascii
 from datetime import datetime
+import hashlib
+import json
 import mock
 import os.path
 import shutil
 import subprocess
 import tempfile
 
-from secondshot.models import File, Saveset, Volume
+from secondshot.models import Cursor, File, Ledger, Saveset, Volume
 from secondshot.actions import Actions
+from secondshot.catalog import Catalog
+from secondshot.config import Config
 from secondshot.constants import Constants
+from secondshot.hasher import Hasher
+from secondshot.manifest import Manifest
 from secondshot.syslogger import Syslog
 
 import test_base
@@ -102,21 +108,105 @@ class TestActions(test_base.TestBase):
         self.assertEqual(ret, expected)
 
         count = 0
-        with open(os.path.join(
-                self.volume_path, self.testhost,
-                Constants.OPTS_DEFAULTS['manifest']), 'r') as mfile:
-            headers = mfile.readline()
-            self.assertEqual(headers, 'file_id,type,file_size,has_checksum\n')
-            for line in mfile:
-                file_id, file_type, file_size, has_sum = line.split(',')
-                file = self.session.query(File).filter_by(id=file_id).one()
-                self.assertEqual('/'.join(file.path.split('/')[:1]),
-                                 os.path.join(self.testhost))
-                self.assertEqual(file.size, 52)
-                self.assertEqual(file.shasum, None)
-                count += 1
+        manifest = Manifest(os.path.join(
+            self.volume_path, self.testhost,
+            Constants.OPTS_DEFAULTS['manifest']))
+        self.assertTrue(manifest.is_binary())
+        for entry in manifest:
+            file = self.session.query(File).filter_by(id=entry.file_id).one()
+            self.assertEqual('/'.join(file.directory.path.split('/')[:1]),
+                             os.path.join(self.testhost))
+            self.assertEqual(file.size, 52)
+            self.assertEqual(file.shasum, None)
+            self.assertFalse(entry.has_sum)
+            count += 1
         self.assertEqual(count, expected['inject']['file_count'])
 
+    def test_inject_reuse(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        manifest = Manifest(os.path.join(
+            self.volume_path, self.testhost,
+            Constants.OPTS_DEFAULTS['manifest']))
+        first = sorted((item.ino, item.file_id) for item in manifest)
+
+        os.chmod(os.path.join(self.volume_path, self.testhost,
+                              os.listdir(self.testdata_path)[0]), 0o600)
+        saveset = Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id)
+        self.session.add(saveset)
+        self.session.commit()
+        with mock.patch('secondshot.catalog.Catalog.upsert',
+                        side_effect=Catalog.upsert, autospec=True) as upsert:
+            ret = obj.inject(self.testhost, self.volume, self.volume_path,
+                             saveset.id)
+            self.assertEqual(sum(len(call[0][1]) for call in
+                                 upsert.call_args_list), 1)
+        self.assertEqual(ret['inject']['file_count'], 15)
+        second = sorted((item.ino, item.file_id) for item in manifest)
+        self.assertEqual(len(set(first) & set(second)), 14)
+
+    def test_inject_reuse_names(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        dirname = os.path.join(self.volume_path, self.testhost)
+        names = sorted(item for item in os.listdir(dirname) if os.path.isfile(
+            os.path.join(dirname, item)) and item != Config.manifest)
+        os.rename(os.path.join(dirname, names[0]),
+                  os.path.join(dirname, 'renamed'))
+        os.link(os.path.join(dirname, names[1]),
+                os.path.join(dirname, 'linked'))
+        saveset = Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id)
+        self.session.add(saveset)
+        self.session.commit()
+        with mock.patch('secondshot.catalog.Catalog.upsert',
+                        side_effect=Catalog.upsert, autospec=True) as upsert:
+            ret = obj.inject(self.testhost, self.volume, self.volume_path,
+                             saveset.id)
+            self.assertEqual(sorted(
+                record['filename'] for call in upsert.call_args_list
+                for record in call[0][1]), ['linked', 'renamed'])
+        self.assertEqual(ret['inject']['file_count'], 16)
+        filenames = [self.session.query(File).filter_by(
+            id=item.file_id).one().filename for item in Manifest(
+                os.path.join(dirname, Config.manifest))]
+        self.assertEqual(len(set(filenames)), 16)
+        self.assertNotIn(names[0], filenames)
+
+    def test_inject_index(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        os.remove(os.path.join(self.volume_path, self.testhost,
+                               Constants.OPTS_DEFAULTS['manifest']))
+
+        saveset = Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id)
+        self.session.add(saveset)
+        self.session.commit()
+        with mock.patch.object(Config, 'index_memory', 1), mock.patch(
+                'secondshot.catalog.Catalog.upsert') as upsert:
+            upsert.return_value = []
+            ret = obj.inject(self.testhost, self.volume, self.volume_path,
+                             saveset.id)
+            upsert.assert_called_once_with([])
+        self.assertEqual(ret['inject']['file_count'], 15)
+
     def test_calc_sums(self):
         expected = dict(calc_sums=dict(
             status='ok',
@@ -134,24 +224,270 @@ class TestActions(test_base.TestBase):
         self.assertEqual(ret, expected)
 
         count = 0
-        with open(os.path.join(
+        for entry in Manifest(os.path.join(
                 self.volume_path, self.testhost,
-                Constants.OPTS_DEFAULTS['manifest']), 'r') as mfile:
-            headers = mfile.readline()
-            self.assertEqual(headers, 'file_id,type,file_size,has_checksum\n')
-            for line in mfile:
-                file_id, file_type, file_size, has_sum = line.split(',')
-                file = self.session.query(File).filter_by(id=file_id).one()
-                if file_type != 'f':
-                    continue
-                print('filename=%s, file_id=%s' % (file.filename, file_id))
-                self.assertEqual(file.shasum,
-                                 binascii.unhexlify(file.filename[9:41]))
-                count += 1
+                Constants.OPTS_DEFAULTS['manifest'])):
+            file = self.session.query(File).filter_by(id=entry.file_id).one()
+            if entry.type != 'f':
+                continue
+            print('filename=%s, file_id=%s' % (file.filename, entry.file_id))
+            self.assertEqual(file.shasum,
+                             binascii.unhexlify(file.filename[9:41]))
+            self.assertTrue(entry.has_sum)
+            count += 1
         self.assertEqual(count, 15)
 
+    def test_calc_sums_resume(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        with mock.patch.object(Constants, 'MAX_INSERT', 4), mock.patch(
+                'secondshot.catalog.Catalog.update_chunks',
+                side_effect=[None, RuntimeError('killed')]):
+            with self.assertRaises(RuntimeError):
+                obj.calc_sums(self.saveset_id)
+        cursor = self.session.query(Cursor).filter_by(
+            saveset_id=self.saveset_id, action='calc_sums').one()
+        self.assertGreater(cursor.position, 0)
+
+        with mock.patch.object(Config, 'resume', True), mock.patch(
+                'secondshot.actions.Actions._pool_digest',
+                side_effect=Actions._pool_digest, autospec=True) as digest:
+            ret = obj.calc_sums(self.saveset_id)
+            self.assertEqual(digest.call_count, 11)
+        self.assertEqual(ret, dict(calc_sums=dict(
+            status='ok', saveset=self.saveset, size=780, processed=780)))
+        self.assertEqual(self.session.query(Cursor).count(), 0)
+        self.assertEqual(self.session.query(File).filter(
+            File.type == 'f', File.shasum.is_(None)).count(), 0)
+
+    def test_calc_sums_savesets(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        ret = obj.calc_sums_savesets([self.saveset])
+        self.assertEqual(ret, dict(calc_sums=dict(status='ok', results=[
+            dict(status='ok', saveset=self.saveset, size=780,
+                 processed=780)])))
+        with self.assertRaises(RuntimeError):
+            obj.calc_sums_savesets(['invalid'])
+
+    def test_calc_sums_workers(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        with mock.patch.object(Config, 'hash_workers', 4):
+            ret = obj.calc_sums(self.saveset_id)
+        self.assertEqual(ret['calc_sums']['processed'], 780)
+
+        for entry in Manifest(os.path.join(
+                self.volume_path, self.testhost,
+                Constants.OPTS_DEFAULTS['manifest'])):
+            file = self.session.query(File).filter_by(id=entry.file_id).one()
+            self.assertEqual(file.shasum,
+                             binascii.unhexlify(file.filename[9:41]))
+            self.assertTrue(entry.has_sum)
+
+    def test_inject_inline_hash(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Config, 'inline_hash', True):
+            ret = obj.inject(self.testhost, self.volume, self.volume_path,
+                             self.saveset_id)
+        self.assertEqual(ret['inject']['file_count'], 15)
+        for entry in Manifest(os.path.join(
+                self.volume_path, self.testhost,
+                Constants.OPTS_DEFAULTS['manifest'])):
+            file = self.session.query(File).filter_by(id=entry.file_id).one()
+            self.assertTrue(entry.has_sum)
+            self.assertEqual(file.shasum,
+                             binascii.unhexlify(file.filename[9:41]))
+            self.assertEqual(file.hashtype, 'md5')
+
+        with mock.patch('secondshot.hasher.Hasher.digests',
+                        side_effect=Hasher.digests, autospec=True) as digests:
+            ret = obj.calc_sums(self.saveset_id)
+            self.assertEqual(ret['calc_sums']['processed'], 0)
+            digests.assert_not_called()
+            ret = obj.verify([self.saveset])
+            self.assertEqual(ret['verify']['results'][0]['count'], 15)
+            self.assertEqual(ret['verify']['results'][0]['errors'], 0)
+            self.assertEqual(digests.call_count, 15)
+
+    def test_inject_inline_hash_unchanged(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Config, 'inline_hash', True):
+            obj.inject(self.testhost, self.volume, self.volume_path,
+                       self.saveset_id)
+        saveset = Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id)
+        self.session.add(saveset)
+        self.session.commit()
+
+        # Neither the inode nor the file index knows these files, but
+        # the catalog already has their checksums
+        with mock.patch.object(Config, 'inline_hash', True), \
+                mock.patch.object(Config, 'index_memory', 0), \
+                mock.patch.object(Actions, '_previous_inodes',
+                                  return_value={}), \
+                mock.patch('secondshot.hasher.Hasher.digests') as digests:
+            ret = obj.inject(self.testhost, self.volume, self.volume_path,
+                             saveset.id)
+            digests.assert_not_called()
+        self.assertEqual(ret['inject']['file_count'], 15)
+        self.assertTrue(all(entry.has_sum for entry in Manifest(os.path.join(
+            self.volume_path, self.testhost, Config.manifest))))
+
+        with mock.patch.object(Config, 'inline_hash', True), \
+                mock.patch('secondshot.catalog.Catalog.upsert',
+                           side_effect=RuntimeError('failed')), \
+                mock.patch('concurrent.futures.ThreadPoolExecutor.shutdown',
+                           autospec=True) as shutdown, \
+                mock.patch.object(Actions, '_previous_inodes',
+                                  return_value={}):
+            with self.assertRaises(RuntimeError):
+                obj.inject(self.testhost, self.volume, self.volume_path,
+                           saveset.id)
+            shutdown.assert_called_once()
+
+    def test_calc_sums_chunks(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        bigfile = os.path.join(self.volume_path, self.testhost, 'bigfile')
+        data = os.urandom(2621440)
+        with open(bigfile, 'wb') as f:
+            f.write(data)
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        with mock.patch.object(Config, 'chunk_size', 1), \
+                mock.patch.object(Config, 'hash_workers', 2):
+            ret = obj.calc_sums(self.saveset_id)
+        self.assertEqual(ret['calc_sums']['processed'], 780 + len(data))
+        file = self.session.query(File).filter_by(filename='bigfile').one()
+        self.assertEqual(file.hashtype, 'merkle-md5')
+        catalog = Catalog(self.session, self.engine, self.testhost_id,
+                          obj.time_fmt)
+        chunks = catalog.get_chunks(file.id)
+        self.assertEqual([item[:2] for item in chunks], [
+            (0, 1048576), (1048576, 1048576), (2097152, 524288)])
+        self.assertEqual(chunks[2][2], hashlib.md5(data[2097152:]).digest())
+        self.assertEqual(file.shasum, Hasher.merkle_root(
+            [item[2] for item in chunks], 'md5'))
+
+        ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['status'], 'ok')
+        self.assertEqual(ret['verify']['results'][0]['count'], 16)
+        stat = os.stat(bigfile)
+        with open(bigfile, 'r+b') as f:
+            f.seek(1500000)
+            f.write(b'corrupt')
+        os.utime(bigfile, (stat.st_atime, stat.st_mtime))
+        with mock.patch.object(Syslog.logger, 'warn') as warn:
+            ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['results'][0]['errors'], 1)
+        self.assertIn('range=1048576-2097151', warn.call_args[0][0])
+
+    def test_calc_sums_hash_cache(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        with mock.patch('secondshot.hasher.Hasher.digests',
+                        side_effect=Hasher.digests, autospec=True) as digest:
+            obj.calc_sums(self.saveset_id)
+            self.assertEqual(digest.call_count, 15)
+            ret = obj.verify([self.saveset])
+            self.assertEqual(ret['verify']['results'][0]['count'], 15)
+            self.assertEqual(digest.call_count, 30)
+        self.assertTrue(os.path.exists(os.path.join(
+            self.snapshot_root, Constants.HASH_CACHE)))
+
+        # calc_sums of another saveset reuses the cache; verify never does
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        self.session.query(File).update({File.shasum: None})
+        self.session.commit()
+        with mock.patch('secondshot.hasher.Hasher.digests',
+                        side_effect=Hasher.digests, autospec=True) as digest:
+            obj.calc_sums(self.saveset_id)
+            self.assertEqual(digest.call_count, 0)
+            obj.verify([self.saveset])
+            self.assertEqual(digest.call_count, 15)
+
+    def test_verify_after_calc_sums(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        filename = os.path.join(self.volume_path, self.testhost, sorted(
+            item for item in os.listdir(os.path.join(
+                self.volume_path, self.testhost))
+            if os.path.isfile(os.path.join(
+                self.volume_path, self.testhost, item)) and
+            item != Config.manifest)[0])
+        stat = os.stat(filename)
+        with open(filename, 'r+b') as f:
+            f.write(b'X')
+        os.utime(filename, (stat.st_atime, stat.st_mtime))
+
+        # Corruption that leaves the cache entry looking current
+        obj.hash_cache.conn.execute(
+            u'UPDATE hashes SET ctime=? WHERE ino=?',
+            (os.stat(filename).st_ctime_ns, stat.st_ino))
+        obj.hash_cache.commit()
+        ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['status'], 'error')
+        self.assertEqual(ret['verify']['results'][0]['errors'], 1)
+
+    def test_evict_cache(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        self.assertEqual(obj.evict_cache(), {'evict-cache': dict(
+            status='ok', removed=0)})
+
+        os.remove(os.path.join(self.volume_path, self.testhost, sorted(
+            item for item in os.listdir(os.path.join(
+                self.volume_path, self.testhost))
+            if os.path.isfile(os.path.join(
+                self.volume_path, self.testhost, item)) and
+            item != Config.manifest)[0]))
+        self.assertEqual(obj.evict_cache(), {'evict-cache': dict(
+            status='ok', removed=1)})
+
+        with mock.patch.object(Actions, '_open_hash_cache',
+                               return_value=False):
+            self.assertEqual(obj.evict_cache()['evict-cache']['status'],
+                             'error')
+
     @mock.patch('subprocess.call')
-    def test_rotate(self, mock_subprocess):
+    @mock.patch('secondshot.hashcache.HashCache.evict')
+    def test_rotate(self, mock_evict, mock_subprocess):
         mock_subprocess.return_value = 0
         expected = dict(rotate=dict(
             status='ok', actions=[dict(
@@ -167,6 +503,8 @@ class TestActions(test_base.TestBase):
 
         self.maxDiff = None
         self.session.add(saveset)
+        self.session.query(Saveset).filter_by(id=self.saveset_id).update(
+            {Saveset.finished: datetime(2018, 8, 1, 13, 0)})
         self.session.commit()
 
         shutil.copytree(
@@ -180,10 +518,56 @@ class TestActions(test_base.TestBase):
         self.assertEqual(ret, expected)
         mock_subprocess.assert_called_once_with(
             ['rsnapshot', '-c', self.rsnapshot_conf, 'short'])
+        mock_evict.assert_not_called()
 
         record = self.session.query(Saveset).filter(Saveset.saveset ==
                                                     'testrotate').one()
         self.assertEqual(record.location, 'short.1')
+        record = self.session.query(Saveset).filter(Saveset.saveset ==
+                                                    self.saveset).one()
+        self.assertEqual(record.location, 'short.0')
+
+    @mock.patch('subprocess.call')
+    def test_rotate_renumber(self, mock_subprocess):
+        mock_subprocess.return_value = 0
+        for location, name in [('long.0', 'long0'), ('long.1', 'long1'),
+                               ('long.2', 'long2'), ('long.1', 'other1'),
+                               ('short.1', 'short1'), ('longer.0', 'longer0')]:
+            self.session.add(Saveset(
+                location=location, saveset=name, host_id=self.testhost_id,
+                backup_host_id=self.testhost_id,
+                finished=datetime(2018, 8, 1, 13, 0)))
+        self.session.commit()
+
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        ret = obj.rotate('long')
+        self.assertEqual(ret, dict(rotate=dict(status='ok', actions=[
+            dict(action='delete', host=self.testhost, location='long.2',
+                 savesets=1),
+            dict(host=self.testhost, savesets=1, location='long.0',
+                 prev='short.1')])))
+        self.assertEqual(dict(
+            (item.saveset, item.location) for item in self.session.query(
+                Saveset).filter(Saveset.saveset != self.saveset)), dict(
+                    long0='long.1', long1='long.2', other1='long.2',
+                    short1='long.0', longer0='longer.0'))
+
+        # another interval matching one with wildcards isn't renumbered
+        obj.intervals['l_ng'] = '3'
+        with mock.patch.object(Config, 'sequence', ['short', 'l_ng']):
+            ret = obj.rotate('l_ng')
+        self.assertEqual(ret['rotate']['status'], 'error')
+        self.assertEqual(dict(
+            (item.saveset, item.location) for item in self.session.query(
+                Saveset).filter(Saveset.saveset != self.saveset)), dict(
+                    long0='long.1', long1='long.2', other1='long.2',
+                    short1='long.0', longer0='longer.0'))
+
+        # the .sync saveset of a backup still in progress stays put
+        ret = obj.rotate('short')
+        self.assertEqual(ret['rotate']['status'], 'error')
+        self.assertEqual(self.session.query(Saveset).filter_by(
+            saveset=self.saveset).one().location, Constants.SYNC_PATH)
 
     @mock.patch('subprocess.call')
     @mock.patch('secondshot.actions.Actions.verify')
@@ -215,7 +599,7 @@ class TestActions(test_base.TestBase):
         mock_inject.assert_called_once_with(
             self.testhost, self.volume, '%s/%s' % (
                 self.snapshot_root, Constants.SYNC_PATH), 555)
-        mock_verify.assert_called_once_with(['test'])
+        mock_verify.assert_called_once_with(['test'], autoverify=True)
         mock_subprocess.assert_called_once_with(
             ['rsnapshot', '-c', self.rsnapshot_conf, 'sync', self.testhost])
 
@@ -224,7 +608,7 @@ class TestActions(test_base.TestBase):
             status='ok', results=[dict(
                 saveset=self.saveset,
                 count=15,
-                errors=0, missing=0, skipped=0)]))
+                errors=0, linked=0, missing=0, skipped=0)]))
 
         shutil.copytree(
             self.testdata_path,
@@ -236,6 +620,323 @@ class TestActions(test_base.TestBase):
         ret = obj.verify([self.saveset])
         self.assertEqual(ret, expected)
 
+    def test_verify_workers(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        self.session.add(Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id))
+        self.session.commit()
+        with mock.patch.object(Constants, 'IO_WINDOW', 1):
+            expected = obj.verify([self.saveset, 'saveset2'])
+        self.assertEqual(expected['verify']['results'][1]['count'], 15)
+        self.assertEqual(expected['verify']['results'][1]['linked'], 15)
+        with mock.patch.object(Config, 'lookup_batch', 4), mock.patch(
+                'secondshot.catalog.Catalog.get_sums',
+                side_effect=Catalog.get_sums, autospec=True) as get_sums:
+            self.assertEqual(obj.verify([self.saveset]), dict(verify=dict(
+                status='ok', results=expected['verify']['results'][:1])))
+            self.assertEqual(get_sums.call_count, 4)
+
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Config, 'hash_workers', 4), \
+                mock.patch.object(Constants, 'IO_WINDOW', 1), mock.patch(
+                'secondshot.hasher.Hasher.digests', side_effect=Hasher.digests,
+                autospec=True) as digests:
+            ret = obj.verify([self.saveset, 'saveset2'])
+            self.assertEqual(digests.call_count, 15)
+        self.assertEqual(ret, expected)
+
+    def test_verify_linked_corrupt(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        self.session.add(Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id))
+        self.session.commit()
+        filename = os.path.join(self.volume_path, self.testhost, sorted(
+            item for item in os.listdir(os.path.join(
+                self.volume_path, self.testhost))
+            if os.path.isfile(os.path.join(
+                self.volume_path, self.testhost, item)) and
+            item != Config.manifest)[0])
+        stat = os.stat(filename)
+        with open(filename, 'r+b') as f:
+            f.write(b'X')
+        os.utime(filename, (stat.st_atime, stat.st_mtime))
+        corrupt = self.session.query(File).filter_by(
+            filename=os.path.basename(filename)).one().id
+
+        # Reads of saveset1 still pending when saveset2 is queued
+        ret = obj.verify([self.saveset, 'saveset2'])
+        self.assertEqual(ret['verify']['status'], 'error')
+        self.assertEqual([(item['errors'], item['linked'])
+                          for item in ret['verify']['results']],
+                         [(1, 0), (1, 0)])
+
+        # Reads of saveset1 finished before saveset2 is queued
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Constants, 'IO_WINDOW', 1):
+            ret = obj.verify([self.saveset, 'saveset2'])
+        self.assertEqual(ret['verify']['status'], 'error')
+        self.assertEqual([(item['errors'], item['linked'])
+                          for item in ret['verify']['results']],
+                         [(1, 0), (1, 14)])
+        self.assertEqual(self.session.query(Ledger).count(), 14)
+        self.assertEqual(self.session.query(Ledger).filter_by(
+            file_id=corrupt).count(), 0)
+
+    def test_verify_resume(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        outcomes = ['verified'] * 4 + ['errors', RuntimeError('killed')]
+        with mock.patch.object(Config, 'io_order', 'manifest'), \
+                mock.patch.object(Constants, 'CURSOR_INTERVAL', 0), \
+                mock.patch('secondshot.actions.Actions._verify_check',
+                           side_effect=outcomes):
+            with self.assertRaises(RuntimeError):
+                obj.verify([self.saveset])
+        cursor = self.session.query(Cursor).filter_by(
+            saveset_id=self.saveset_id, action='verify').one()
+        self.assertEqual(cursor.counters,
+                         '{"count": 5, "errors": 1, "verified": 4}')
+
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Config, 'resume', True), mock.patch(
+                'secondshot.hasher.Hasher.digests', side_effect=Hasher.digests,
+                autospec=True) as digests:
+            ret = obj.verify([self.saveset])
+            self.assertEqual(digests.call_count, 10)
+        self.assertEqual(ret, dict(verify=dict(
+            status='error', results=[dict(
+                saveset=self.saveset, count=15, errors=1, linked=0,
+                missing=0, skipped=0)])))
+        self.assertEqual(self.session.query(Cursor).count(), 0)
+
+    def test_verify_metadata(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        with mock.patch.object(Config, 'verify_level', 'metadata'), \
+                mock.patch('secondshot.hasher.Hasher.digests') as digests:
+            ret = obj.verify([self.saveset])
+            digests.assert_not_called()
+        self.assertEqual(ret['verify']['results'][0]['count'], 15)
+        self.assertEqual(ret['verify']['results'][0]['errors'], 0)
+        self.assertEqual(self.session.query(Ledger).count(), 0)
+
+        files = []
+        for dirpath, _, filenames in os.walk(os.path.join(
+                self.volume_path, self.testhost)):
+            files += [os.path.join(dirpath, filename) for filename in
+                      sorted(filenames) if filename != Config.manifest]
+        with open(files[0], 'r+b') as f:
+            f.truncate(1)
+        os.chmod(files[1], 0o600)
+        os.utime(files[2], (0, 0))
+        os.remove(files[3])
+        with mock.patch.object(Config, 'verify_level', 'metadata'):
+            ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['status'], 'error')
+        self.assertEqual(ret['verify']['results'][0]['errors'], 4)
+
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch(
+                'secondshot.hasher.Hasher.digests', side_effect=Hasher.digests,
+                autospec=True) as digests:
+            ret = obj.verify([self.saveset])
+            self.assertEqual(digests.call_count, 11)
+        self.assertEqual(ret['verify']['results'][0]['errors'], 4)
+        self.assertEqual(self.session.query(Ledger).count(), 11)
+
+    def test_verify_metadata_types(self):
+        dirname = os.path.join(self.volume_path, self.testhost)
+        shutil.copytree(self.testdata_path, dirname)
+        os.symlink('target', os.path.join(dirname, 'symlink'))
+        os.symlink('target', os.path.join(dirname, 'removed'))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        with mock.patch.object(Config, 'verify_level', 'metadata'):
+            ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['results'][0]['count'], 17)
+        self.assertEqual(ret['verify']['results'][0]['errors'], 0)
+
+        os.remove(os.path.join(dirname, 'symlink'))
+        os.symlink('other target', os.path.join(dirname, 'symlink'))
+        os.remove(os.path.join(dirname, 'removed'))
+        with mock.patch.object(Config, 'verify_level', 'metadata'):
+            ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['results'][0]['errors'], 2)
+        ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['results'][0]['count'], 15)
+        self.assertEqual(ret['verify']['results'][0]['errors'], 0)
+
+    def test_verify_metadata_unsummed(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        self.session.add(Saveset(
+            location=Constants.SYNC_PATH, saveset='saveset2',
+            host_id=self.testhost_id, backup_host_id=self.testhost_id))
+        self.session.commit()
+        files = []
+        for dirpath, _, filenames in os.walk(os.path.join(
+                self.volume_path, self.testhost)):
+            files += [os.path.join(dirpath, filename) for filename in
+                      sorted(filenames) if filename != Config.manifest]
+        with open(files[0], 'r+b') as f:
+            f.truncate(1)
+        os.remove(files[1])
+
+        # No file has a checksum yet; damaged inodes aren't linked
+        with mock.patch.object(Config, 'verify_level', 'metadata'), \
+                mock.patch.object(Constants, 'IO_WINDOW', 1):
+            ret = obj.verify([self.saveset, 'saveset2'])
+        self.assertEqual(ret['verify']['status'], 'error')
+        self.assertEqual([(item['count'], item['errors'], item['linked'])
+                          for item in ret['verify']['results']],
+                         [(15, 2, 0), (15, 2, 13)])
+        self.assertEqual(self.session.query(Ledger).count(), 0)
+
+    def test_verify_report(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        files = []
+        for dirpath, _, filenames in os.walk(os.path.join(
+                self.volume_path, self.testhost)):
+            files += [os.path.join(dirpath, filename) for filename in
+                      sorted(filenames) if filename != Config.manifest]
+        stat = os.stat(files[0])
+        with open(files[0], 'r+b') as f:
+            f.write(b'X')
+        os.utime(files[0], (stat.st_atime, stat.st_mtime))
+        os.remove(files[1])
+
+        report = tempfile.mkstemp(prefix='_test')[1]
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Config, 'report', report), mock.patch(
+                'secondshot.syslogger.Syslog.warn') as mock_warn:
+            ret = obj.verify([self.saveset])
+            mock_warn.assert_not_called()
+        with open(report) as f:
+            records = [json.loads(line) for line in f]
+        os.remove(report)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(sorted((item['outcome'], os.path.basename(
+            item['file'])) for item in records[:2]), [
+                ('bad_checksum', os.path.basename(files[0])),
+                ('bad_metadata', os.path.basename(files[1]))])
+        self.assertEqual(records[2], dict(
+            ret['verify'], record='summary', problems=2))
+        self.assertEqual(ret['verify']['results'][0]['errors'], 2)
+
+        # an interrupted verify still closes the report with a summary
+        report = tempfile.mkstemp(prefix='_test')[1]
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        with mock.patch.object(Config, 'report', report), mock.patch(
+                'secondshot.actions.Actions._verify_check',
+                side_effect=RuntimeError('killed')):
+            with self.assertRaises(RuntimeError):
+                obj.verify([self.saveset])
+        with open(report) as f:
+            records = [json.loads(line) for line in f]
+        os.remove(report)
+        self.assertEqual(records[-1], dict(
+            record='summary', status='error', error='verify did not finish',
+            problems=len(records) - 1))
+
+    def test_verify_budget(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        with mock.patch.object(Config, 'verify_budget', '260'):
+            ret = obj.verify([self.saveset])
+            self.assertEqual(ret['verify']['results'][0]['count'], 5)
+            self.assertEqual(ret['verify']['coverage'], 33.3)
+            ret = obj.verify([self.saveset])
+            self.assertEqual(ret['verify']['results'][0]['count'], 5)
+            self.assertEqual(ret['verify']['coverage'], 66.7)
+            first = set(item.file_id for item in self.session.query(Ledger))
+            ret = obj.verify([self.saveset])
+            self.assertEqual(ret['verify']['coverage'], 100.0)
+            ret = obj.verify([self.saveset])
+            self.assertEqual(ret['verify']['results'][0]['count'], 0)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(self.session.query(Ledger).count(), 15)
+
+        # the autoverify of start reads every file
+        with mock.patch.object(Config, 'verify_budget', '260'):
+            ret = obj.verify([self.saveset], autoverify=True)
+        self.assertEqual(ret['verify']['results'][0]['count'], 15)
+        self.assertNotIn('coverage', ret['verify'])
+
+        # manifests are read and looked up once
+        self.session.query(Ledger).delete()
+        self.session.query(File).filter_by(id=min(first)).delete()
+        self.session.commit()
+        with mock.patch.object(Config, 'verify_budget', '260'), \
+                mock.patch.object(Syslog.logger, 'warn') as warn, mock.patch(
+                    'secondshot.catalog.Catalog.get_sums',
+                    side_effect=Catalog.get_sums, autospec=True) as get_sums:
+            ret = obj.verify([self.saveset])
+            self.assertEqual(get_sums.call_count, 1)
+        self.assertEqual(ret['verify']['results'][0]['missing'], 1)
+        self.assertEqual(len([call for call in warn.call_args_list
+                              if 'not found' in call[0][0]]), 1)
+
+    def test_verify_rehash(self):
+        shutil.copytree(
+            self.testdata_path,
+            os.path.join(self.volume_path, self.testhost))
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        obj.inject(self.testhost, self.volume, self.volume_path,
+                   self.saveset_id)
+        obj.calc_sums(self.saveset_id)
+        with mock.patch.object(Config, 'rehash', 'blake2b'):
+            ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['status'], 'ok')
+        for file in self.session.query(File).filter_by(type='f'):
+            self.assertEqual(file.hashtype, 'blake2b')
+            self.assertEqual(len(file.shasum), 64)
+
+        obj = Actions(self.cli, db_engine=self.engine, db_session=self.session)
+        ret = obj.verify([self.saveset])
+        self.assertEqual(ret['verify']['status'], 'ok')
+        self.assertEqual(ret['verify']['results'][0]['count'], 15)
+
     def test_list_hosts(self):
         expected = dict(hosts=[dict(name=self.testhost)])
 
@@ -308,6 +1009,19 @@ class TestActions(test_base.TestBase):
         with self.assertRaises(RuntimeError):
             Actions._hashtype('invalid')
 
+    def test_sparseness(self):
+        file_stat = mock.Mock(st_mode=0o100644, st_size=1048576,
+                              st_blksize=4096, st_blocks=512)
+        self.assertEqual(Actions._sparseness(file_stat), 0.25)
+        file_stat.st_blocks = 2056
+        self.assertEqual(Actions._sparseness(file_stat), 1)
+        file_stat = mock.Mock(st_mode=0o100644, st_size=52,
+                              st_blksize=4096, st_blocks=0)
+        self.assertEqual(Actions._sparseness(file_stat), 1)
+        file_stat = mock.Mock(st_mode=0o040755, st_size=8192,
+                              st_blksize=4096, st_blocks=0)
+        self.assertEqual(Actions._sparseness(file_stat), 1)
+
     def test_filetype(self):
         self.assertEqual(Actions._filetype(0o0010000), 'p')
         self.assertEqual(Actions._filetype(0o0020000), 'c')
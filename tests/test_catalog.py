@@ -0,0 +1,151 @@
+"""test_catalog
+
+Tests for Catalog class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+from datetime import datetime
+
+from secondshot.catalog import Catalog, FileIndex, PathCache
+from secondshot.constants import Constants
+from secondshot.models import File, Path
+
+import test_base
+
+
+class TestCatalog(test_base.TestBase):
+
+    def setUp(self):
+        super(TestCatalog, self).setUp()
+        self.catalog = Catalog(self.session, self.engine, self.testhost_id,
+                               '%Y-%m-%d %H:%M:%S')
+
+    def _records(self, count):
+        paths = PathCache(self.session, self.engine)
+        records = [dict(
+            path_id=paths.get_id(self.testhost_id, 'test/dir%d' % (item % 3)),
+            filename='file%d' % item,
+            owner='root', grp='root', uid=0, gid=0, mode=0o100644,
+            size=item * 10, mtime='2018-08-01 13:47:00',
+            ctime='2018-08-01 13:47:00', last_backup='2018-08-01 13:47:00',
+            links=1, sparseness=1, type='f', host_id=self.testhost_id)
+            for item in range(count)]
+        for record in records:
+            record['fingerprint'] = self.catalog.fingerprint(record)
+        return records
+
+    def test_upsert(self):
+        records = self._records(Constants.SQLITE_MAX_VARS // 10)
+        catalog = Catalog(self.session, self.engine, self.testhost_id,
+                          '%Y-%m-%d %H:%M:%S')
+        ret = catalog.upsert(records)
+        self.assertEqual(len(ret), len(records))
+        self.assertEqual(len(set(ret)), len(records))
+        for (file_id, has_sum), record in zip(ret, records):
+            self.assertFalse(has_sum)
+            file = self.session.query(File).filter_by(id=file_id).one()
+            self.assertEqual(file.filename, record['filename'])
+            self.assertEqual(file.path_id, record['path_id'])
+
+        self.session.query(File).filter_by(id=ret[5][0]).update(
+            {File.shasum: b'0123456789abcdef'})
+        for record in records:
+            record['owner'] = 'nobody'
+        again = catalog.upsert(records)
+        self.assertEqual([item[0] for item in again],
+                         [item[0] for item in ret])
+        self.assertEqual([item[1] for item in again].count(True), 1)
+        self.assertTrue(again[5][1])
+        self.assertEqual(self.session.query(File).filter_by(
+            owner='nobody').count(), len(records))
+
+    def test_fingerprint(self):
+        record = self._records(1)[0]
+        ret = self.catalog.fingerprint(record)
+        self.assertEqual(len(ret), 16)
+        self.assertEqual(ret, self.catalog.fingerprint(dict(
+            record, mtime=datetime(2018, 8, 1, 13, 47), owner='other')))
+        self.assertNotEqual(ret, self.catalog.fingerprint(dict(
+            record, uid=1)))
+
+    def test_upsert_empty(self):
+        catalog = Catalog(self.session, self.engine, self.testhost_id,
+                          '%Y-%m-%d %H:%M:%S')
+        self.assertEqual(catalog.upsert([]), [])
+
+    def test_path_cache(self):
+        paths = PathCache(self.session, self.engine)
+        path_id = paths.get_id(self.testhost_id, 'test/a/b')
+        self.assertEqual(paths.get_id(self.testhost_id, 'test/a/b'), path_id)
+        self.assertNotEqual(paths.get_id(self.testhost_id, 'test/a'),
+                            path_id)
+        self.assertEqual(PathCache(self.session, self.engine).get_path(
+            path_id), 'test/a/b')
+        self.assertEqual(PathCache(self.session, self.engine).get_id(
+            self.testhost_id, 'test/a/b'), path_id)
+        self.assertEqual(self.session.query(Path).count(), 2)
+
+    def test_file_index(self):
+        records = self._records(20)
+        catalog = Catalog(self.session, self.engine, self.testhost_id,
+                          '%Y-%m-%d %H:%M:%S')
+        ids = catalog.upsert(records)
+
+        index = FileIndex(catalog, 1024 * 1024)
+        self.assertEqual(index.load(), 20)
+        self.assertTrue(index.complete)
+        for record, item in zip(records, ids):
+            self.assertEqual(index.get(record), item)
+        records[0]['size'] += 1
+        records[0]['fingerprint'] = catalog.fingerprint(records[0])
+        self.assertIsNone(index.get(records[0]))
+
+        index = FileIndex(catalog, 5 * Constants.INDEX_ENTRY_BYTES)
+        self.assertEqual(index.load(), 5)
+        self.assertFalse(index.complete)
+
+    def test_update_sums(self):
+        records = self._records(Constants.SQLITE_MAX_VARS + 5)
+        ids = [file_id for file_id, _ in self.catalog.upsert(records)]
+        names = self.catalog.get_names(ids)
+        self.assertEqual(len(names), len(ids))
+        self.assertEqual(names[ids[4]], (records[4]['path_id'], 'file4'))
+
+        self.catalog.update_sums([(file_id, b'%016d' % file_id)
+                                  for file_id in ids[:10]], 'md5')
+        self.catalog.update_sums([], 'md5')
+        ret = self.catalog.upsert(records)
+        self.assertEqual([has_sum for _, has_sum in ret[:11]],
+                         [True] * 10 + [False])
+        file = self.session.query(File).filter_by(id=ids[3]).one()
+        self.assertEqual((file.shasum, file.hashtype),
+                         (b'%016d' % ids[3], 'md5'))
+
+        sums = self.catalog.get_sums(ids)
+        self.assertEqual(len(sums), len(ids))
+        self.assertEqual((sums[ids[3]].path_id, sums[ids[3]].filename,
+                          sums[ids[3]].shasum, sums[ids[3]].hashtype),
+                         (records[3]['path_id'], 'file3', b'%016d' % ids[3],
+                          'md5'))
+        self.assertIsNone(sums[ids[10]].shasum)
+
+    def test_upsert_shasum(self):
+        records = self._records(3)
+        for record in records:
+            (record['shasum'], record['hashtype']) = (None, None)
+        records[1].update(shasum=b'first', hashtype='md5')
+        ret = self.catalog.upsert(records)
+        self.assertEqual([has_sum for _, has_sum in ret],
+                         [False, True, False])
+
+        for record in records:
+            record.update(shasum=b'second', hashtype='sha256')
+        self.catalog.upsert(records)
+        self.assertEqual(
+            [(item.shasum, item.hashtype) for item in self.session.query(
+                File).order_by(File.id)],
+            [(b'second', 'sha256'), (b'first', 'md5'),
+             (b'second', 'sha256')])
@@ -44,15 +44,42 @@ class TestConfig(test_base.TestBase):
     def test_validate_configs(self):
         cfg = Config()
         cfg.validate_configs(dict(hashtype='sha256'), ['hashtype'])
+        cfg.validate_configs(dict(hashtype='blake2b'), ['hashtype'])
+        cfg.validate_configs(dict(rehash=None), ['rehash'])
         cfg.validate_configs(dict(autoverify='yes'), ['autoverify'])
+        cfg.validate_configs(dict(resume='yes'), ['resume'])
         with self.assertRaises(ValueError):
             cfg.validate_configs(dict(autoverify='badvalue'), ['autoverify'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'inline-hash': 'maybe'}, ['inline-hash'])
         with self.assertRaises(ValueError):
             cfg.validate_configs(dict(format='badvalue'), ['format'])
         with self.assertRaises(ValueError):
             cfg.validate_configs(dict(hashtype='badvalue'), ['hashtype'])
         with self.assertRaises(ValueError):
             cfg.validate_configs(dict(boguskeyword='test'), ['command'])
+        cfg.validate_configs({'scan-workers': '4'}, ['scan-workers'])
+        cfg.validate_configs({'hash-workers': '8'}, ['hash-workers'])
+        cfg.validate_configs({'chunk-size': '64'}, ['chunk-size'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'chunk-size': '-1'}, ['chunk-size'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'manifest-format': 'xml'},
+                                 ['manifest-format'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'scan-workers': '0'}, ['scan-workers'])
+        cfg.validate_configs({'io-order': 'inode'}, ['io-order'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'lookup-batch': '0'}, ['lookup-batch'])
+        cfg.validate_configs({'verify-budget': '500G'}, ['verify-budget'])
+        cfg.validate_configs({'verify-budget': '4h'}, ['verify-budget'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'verify-budget': '4d'}, ['verify-budget'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'io-order': 'random'}, ['io-order'])
+        cfg.validate_configs({'verify-level': 'metadata'}, ['verify-level'])
+        with self.assertRaises(ValueError):
+            cfg.validate_configs({'verify-level': 'full'}, ['verify-level'])
 
     def test_db_set_new_item(self):
         cfg = Config()
@@ -143,6 +170,7 @@ class TestConfig(test_base.TestBase):
         expected = {
             'action': 'list-hosts',
             'autoverify': 'false',
+            'chunk-size': '0',
             'db-url': None,
             'dbhost': 'db00',
             'dbname': 'secondshot',
@@ -150,12 +178,23 @@ class TestConfig(test_base.TestBase):
             'dbport': '3306',
             'dbtype': 'sqlite',
             'dbuser': 'bkp',
+            'hash-workers': '1',
             'hashtype': 'md5',
             'host': ['test', 'cnn', 'fox'],
+            'index-memory': '0',
+            'inline-hash': 'no',
+            'io-order': 'physical',
+            'lookup-batch': '1000',
             'logfile': '/var/log/test',
             'manifest': '.snapshot-manifest',
+            'manifest-format': 'binary',
+            'resume': 'no',
             'rsnapshot-conf': Constants.OPTS_DEFAULTS['rsnapshot-conf'],
-            'sequence': 'default'}
+            'scan-workers': '1',
+            'sequence': 'default',
+            'verify-budget': None,
+            'verify-cycle': '30',
+            'verify-level': 'content'}
 
         cli = Constants.OPTS_DEFAULTS.copy()
         cli.update(dict(
@@ -0,0 +1,69 @@
+"""test_hashcache
+
+Tests for HashCache class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from secondshot.hashcache import HashCache
+
+
+class TestHashCache(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='_testdir')
+        self.location = os.path.join(self.path, 'hourly.0')
+        os.mkdir(self.location)
+        self.filename = os.path.join(self.location, 'file')
+        with open(self.filename, 'w') as f:
+            f.write('contents')
+        self.cache = HashCache(os.path.join(self.path, 'cache'))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.path)
+
+    def test_get_put(self):
+        stat = os.stat(self.filename)
+        self.assertIsNone(self.cache.get(stat, 'md5'))
+        self.cache.put(stat, 'md5', b'digest', 'file')
+        self.cache.commit()
+        self.assertEqual(self.cache.get(stat, 'md5'), b'digest')
+        self.assertEqual(self.cache.get(stat, 'md5', this_run=True),
+                         b'digest')
+        self.assertIsNone(self.cache.get(stat, 'sha256'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 2))
+
+        cache = HashCache(self.cache.filename)
+        self.assertEqual(cache.get(stat, 'md5'), b'digest')
+        self.assertIsNone(cache.get(stat, 'md5', this_run=True))
+        cache.close()
+
+        with open(self.filename, 'a') as f:
+            f.write('changed')
+        self.assertIsNone(self.cache.get(os.stat(self.filename), 'md5'))
+
+    def test_evict(self):
+        self.cache.put(os.stat(self.filename), 'md5', b'digest', 'file')
+        other = os.path.join(self.location, 'other')
+        with open(other, 'w') as f:
+            f.write('other')
+        self.cache.put(os.stat(other), 'md5', b'digest', 'other')
+        os.remove(other)
+
+        rotated = os.path.join(self.path, 'hourly.1')
+        os.rename(self.location, rotated)
+        self.assertEqual(self.cache.evict([self.location, rotated]), 1)
+        self.assertEqual(self.cache.get(os.stat(os.path.join(
+            rotated, 'file')), 'md5'), b'digest')
+
+    def test_signed(self):
+        self.assertEqual(HashCache._signed(5), 5)
+        self.assertEqual(HashCache._signed((1 << 64) - 1), -1)
@@ -0,0 +1,94 @@
+"""test_hasher
+
+Tests for Hasher class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from secondshot.hasher import Hasher
+
+
+class TestHasher(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='_testdir')
+        self.filename = os.path.join(self.path, 'file')
+        self.data = os.urandom(10000)
+        with open(self.filename, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_digest(self):
+        hasher = Hasher(bufsize=4096)
+        for hashtype in ['md5', 'sha256', 'sha512']:
+            self.assertEqual(hasher.digest(self.filename, hashtype),
+                             hashlib.new(hashtype, self.data).digest())
+        self.assertEqual(hasher.files, 3)
+        self.assertEqual(hasher.bytes, 3 * len(self.data))
+        self.assertGreater(hasher.throughput(), 0)
+
+    def test_digests(self):
+        hasher = Hasher()
+        ret = hasher.digests(self.filename, ['md5', 'blake2b'])
+        self.assertEqual(ret, [hashlib.md5(self.data).digest(),
+                               hashlib.blake2b(self.data).digest()])
+        self.assertEqual(hasher.bytes, len(self.data))
+
+    def test_digest_range(self):
+        hasher = Hasher(bufsize=1000)
+        self.assertEqual(hasher.digest_range(self.filename, 'md5', 2500, 4000),
+                         hashlib.md5(self.data[2500:6500]).digest())
+        self.assertEqual(hasher.digest_range(self.filename, 'md5', 8000, 4000),
+                         hashlib.md5(self.data[8000:]).digest())
+        self.assertEqual(hasher.bytes, 6000)
+
+    def test_merkle_root(self):
+        leaves = [hashlib.md5(self.data[item:item + 3000]).digest()
+                  for item in range(0, len(self.data), 3000)]
+        self.assertEqual(Hasher.merkle_root(leaves, 'md5'), hashlib.md5(
+            hashlib.md5(leaves[0] + leaves[1]).digest() +
+            hashlib.md5(leaves[2] + leaves[3]).digest()).digest())
+        self.assertEqual(Hasher.merkle_root(leaves[:3], 'md5'), hashlib.md5(
+            hashlib.md5(leaves[0] + leaves[1]).digest() +
+            leaves[2]).digest())
+        self.assertEqual(Hasher.merkle_root(leaves[:1], 'md5'), leaves[0])
+
+    def test_sparse(self):
+        with open(self.filename, 'wb') as f:
+            f.seek(3 * 1048576)
+            f.write(self.data)
+            f.truncate(6 * 1048576)
+        data = bytes(3 * 1048576) + self.data + bytes(
+            3 * 1048576 - len(self.data))
+        hasher = Hasher(bufsize=65536)
+        self.assertEqual(hasher.digests(self.filename, ['md5', 'sha256']),
+                         [hashlib.md5(data).digest(),
+                          hashlib.sha256(data).digest()])
+        self.assertEqual(hasher.digest_range(
+            self.filename, 'md5', 3 * 1048576 - 100, 200),
+            hashlib.md5(data[3 * 1048576 - 100:3 * 1048576 + 100]).digest())
+        if (os.stat(self.filename).st_blocks * 512 < len(data)):
+            self.assertLess(hasher.bytes, len(data))
+            self.assertEqual(hasher.bytes + hasher.holes, len(data) + 200)
+
+    def test_empty(self):
+        open(self.filename, 'w').close()
+        hasher = Hasher()
+        self.assertEqual(hasher.digest(self.filename, 'md5'),
+                         hashlib.md5(b'').digest())
+        self.assertEqual(hasher.bytes, 0)
+        self.assertEqual(Hasher().throughput(), 0.0)
+
+    def test_missing(self):
+        with self.assertRaises(OSError):
+            Hasher().digest(os.path.join(self.path, 'missing'), 'md5')
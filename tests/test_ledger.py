@@ -0,0 +1,68 @@
+"""test_ledger
+
+Tests for VerifyBudget class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+from datetime import datetime, timedelta
+import mock
+import unittest
+
+from secondshot.ledger import VerifyBudget
+
+
+class TestVerifyBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 10, 17, 12, 0)
+
+    def test_parse(self):
+        self.assertEqual(VerifyBudget.parse('500'), (500, None))
+        self.assertEqual(VerifyBudget.parse('2G'), (2 << 30, None))
+        self.assertEqual(VerifyBudget.parse('90m'), (None, 5400))
+        for amount in ['0', '4d', 'G', '-1']:
+            with self.assertRaises(ValueError):
+                VerifyBudget.parse(amount)
+
+    def test_bytes(self):
+        budget = VerifyBudget('250', 30, self.now)
+        files = [(None, 100), (self.now - timedelta(days=40), 100),
+                 (self.now - timedelta(days=35), 100),
+                 (self.now - timedelta(days=35), 40),
+                 (self.now - timedelta(days=2), 100)]
+        for verified, size in files:
+            budget.add(verified, size)
+        budget.plan()
+        self.assertEqual(budget.cutoff, 35)
+        self.assertEqual([budget.select(verified, size)
+                          for verified, size in files],
+                         [True, True, False, True, False])
+        budget.verified = 240
+        self.assertEqual(budget.coverage(), 340.0 / 440 * 100)
+
+    def test_bytes_all_due(self):
+        budget = VerifyBudget('1K', 30, self.now)
+        files = [(None, 100), (self.now - timedelta(days=30), 100),
+                 (self.now - timedelta(days=29), 100)]
+        for verified, size in files:
+            budget.add(verified, size)
+        budget.plan()
+        self.assertEqual([budget.select(verified, size)
+                          for verified, size in files], [True, True, False])
+
+    @mock.patch('time.monotonic')
+    def test_seconds(self, mock_time):
+        mock_time.return_value = 1000.0
+        budget = VerifyBudget('1h', 30, self.now)
+        budget.add(None, 100)
+        budget.plan()
+        self.assertTrue(budget.select(None, 100))
+        self.assertFalse(budget.select(self.now, 100))
+        self.assertFalse(budget.exhausted())
+        mock_time.return_value = 4600.0
+        self.assertFalse(budget.select(None, 100))
+        self.assertTrue(budget.exhausted())
+        self.assertEqual(VerifyBudget('1h', 30, self.now).coverage(), 100.0)
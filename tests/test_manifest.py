@@ -0,0 +1,131 @@
+"""test_manifest
+
+Tests for Manifest class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from secondshot.manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp(prefix='_testdir')
+        self.filename = os.path.join(self.path, '.snapshot-manifest')
+        self.files = []
+        for item in range(3):
+            self.files.append(os.path.join(self.path, 'file%d' % item))
+            with open(self.files[-1], 'w') as f:
+                f.write('x' * item)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _create(self, fmt='binary'):
+        manifest = Manifest(self.filename, fmt)
+        manifest.create()
+        for item, filename in enumerate(self.files):
+            manifest.append(100 + item, 'f', item == 1, os.lstat(filename))
+        manifest.commit()
+        return manifest
+
+    def _names(self, file_ids):
+        return dict((100 + item, (1, os.path.basename(filename)))
+                    for item, filename in enumerate(self.files)
+                    if 100 + item in file_ids)
+
+    def _lookup(self, index, item, filename=None):
+        return Manifest.lookup(index, os.lstat(self.files[item]), 1,
+                               filename or os.path.basename(self.files[item]))
+
+    def test_create_and_read(self):
+        manifest = self._create()
+        self.assertFalse(os.path.exists(self.filename + '.tmp'))
+        ret = list(manifest)
+        self.assertEqual([(item.file_id, item.type, item.size, item.has_sum)
+                          for item in ret],
+                         [(100, 'f', 0, False), (101, 'f', 1, True),
+                          (102, 'f', 2, False)])
+        self.assertEqual(ret[2].ino, os.lstat(self.files[2]).st_ino)
+        with open(self.filename, 'rb') as f:
+            data = f.read()
+        self.assertEqual(len(data), Manifest.HEADER.size +
+                         3 * Manifest.RECORD.size)
+        self.assertEqual(data[ret[1].position:ret[1].position + 1], b'Y')
+
+    def test_create_csv(self):
+        manifest = self._create('csv')
+        self.assertFalse(manifest.is_binary())
+        ret = list(Manifest(self.filename))
+        self.assertEqual([(item.file_id, item.size, item.has_sum)
+                          for item in ret],
+                         [(100, 0, False), (101, 1, True), (102, 2, False)])
+        self.assertEqual(ret[2].ino, os.lstat(self.files[2]).st_ino)
+
+    def test_entries_start(self):
+        for fmt in Manifest.FORMATS:
+            manifest = self._create(fmt)
+            ret = list(manifest)
+            self.assertEqual(list(manifest.entries(start=ret[0].end)),
+                             ret[1:])
+            self.assertEqual(list(manifest.entries(start=ret[2].end)), [])
+
+    def test_mark(self):
+        for fmt in Manifest.FORMATS:
+            manifest = self._create(fmt)
+            manifest.open_update()
+            self.assertEqual(manifest.map is not None, fmt == 'binary')
+            for entry in manifest:
+                if (not entry.has_sum):
+                    manifest.mark(entry)
+            manifest.close()
+            self.assertEqual([item.has_sum for item in manifest],
+                             [True, True, True])
+
+    def test_legacy_format(self):
+        with open(self.filename, 'w') as f:
+            f.write('file_id,type,file_size,has_checksum\n'
+                    '7,f,52,N\n8,l,10,N\n')
+        manifest = Manifest(self.filename)
+        ret = list(manifest)
+        self.assertEqual((ret[1].file_id, ret[1].type, ret[1].ino),
+                         (8, 'l', None))
+        manifest.open_update()
+        manifest.mark(ret[0])
+        manifest.close()
+        with open(self.filename, 'r') as f:
+            self.assertEqual(f.read(), 'file_id,type,file_size,has_checksum\n'
+                             '7,f,52,Y\n8,l,10,N\n')
+        self.assertEqual(manifest.inode_index(self._names), {})
+
+    def test_inode_index(self):
+        manifest = self._create()
+        index = manifest.inode_index(self._names)
+        self.assertEqual(self._lookup(index, 1), (101, 'f', True))
+
+        # a new or renamed name for the inode isn't its file record
+        self.assertIsNone(self._lookup(index, 1, filename='renamed'))
+        self.assertIsNone(Manifest.lookup(index, os.lstat(self.files[1]), 2,
+                                          os.path.basename(self.files[1])))
+
+        with open(self.files[1], 'a') as f:
+            f.write('changed')
+        self.assertIsNone(self._lookup(index, 1))
+
+        os.link(self.files[2], os.path.join(self.path, 'link'))
+        self.files.append(os.path.join(self.path, 'link'))
+        index = self._create().inode_index(self._names)
+        self.assertIsNone(self._lookup(index, 2))
+        self.assertEqual(self._lookup(index, 0), (100, 'f', False))
+
+        # entries whose file record is gone aren't indexed
+        index = manifest.inode_index(lambda file_ids: {})
+        self.assertIsNone(self._lookup(index, 0))
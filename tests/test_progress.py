@@ -0,0 +1,85 @@
+"""test_progress
+
+Tests for Progress class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import mock
+
+from secondshot.constants import Constants
+from secondshot.manifest import ManifestEntry
+from secondshot.models import Cursor, Saveset
+from secondshot.progress import Progress
+
+import test_base
+
+
+class TestProgress(test_base.TestBase):
+
+    def setUp(self):
+        super(TestProgress, self).setUp()
+        record = Saveset(location='short.0', saveset='saveset1',
+                         host_id=self.testhost_id,
+                         backup_host_id=self.testhost_id)
+        self.session.add(record)
+        self.session.commit()
+        self.saveset_id = record.id
+        self.entries = [ManifestEntry(
+            item, 'f', 10, True, 0, item, 0, 0, 0, 0, item * 100 - 1,
+            item * 100) for item in range(1, 7)]
+
+    def test_out_of_order(self):
+        progress = Progress(self.session, self.saveset_id, 'verify')
+        for entry in self.entries[:4]:
+            progress.add(entry)
+        progress.done(self.entries[1], count=1, errors=1)
+        progress.done(self.entries[3], count=1)
+        self.assertEqual((progress.position, progress.counters), (0, {}))
+        progress.done(self.entries[0], count=1)
+        self.assertEqual((progress.position, progress.counters),
+                         (200, dict(count=2, errors=1)))
+        progress.done(self.entries[2], count=1)
+        self.assertEqual((progress.position, progress.counters),
+                         (400, dict(count=4, errors=1)))
+
+    def test_fold(self):
+        progress = Progress(self.session, self.saveset_id, 'calc_sums')
+        progress.add(self.entries[0])
+        for entry in self.entries[1:]:
+            progress.add(entry)
+            progress.done(entry, size=entry.size)
+        self.assertEqual(len(progress.outstanding), 2)
+        self.assertEqual(progress.position, 0)
+        progress.done(self.entries[0], size=10, processed=10)
+        self.assertEqual((progress.position, progress.counters),
+                         (600, dict(size=60, processed=10)))
+        self.assertEqual(len(progress.outstanding), 0)
+
+    def test_save_load_clear(self):
+        progress = Progress(self.session, self.saveset_id, 'verify')
+        progress.add(self.entries[0])
+        progress.done(self.entries[0], count=1)
+        progress.save()
+        progress.save()
+        self.session.commit()
+        self.assertEqual(self.session.query(Cursor).count(), 1)
+
+        ret = Progress(self.session, self.saveset_id, 'verify')
+        self.assertEqual(ret.load(), 100)
+        self.assertEqual(ret.counters, dict(count=1))
+        self.assertEqual(Progress(
+            self.session, self.saveset_id, 'calc_sums').load(), 0)
+        ret.clear()
+        self.session.commit()
+        self.assertEqual(self.session.query(Cursor).count(), 0)
+
+    @mock.patch('time.monotonic')
+    def test_due(self, mock_time):
+        mock_time.return_value = 1000.0
+        progress = Progress(self.session, self.saveset_id, 'verify')
+        self.assertFalse(progress.due())
+        mock_time.return_value += Constants.CURSOR_INTERVAL
+        self.assertTrue(progress.due())
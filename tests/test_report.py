@@ -0,0 +1,48 @@
+"""test_report
+
+Tests for VerifyReport class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import json
+import mock
+import os
+import tempfile
+import unittest
+
+from secondshot.report import VerifyReport
+
+
+class TestVerifyReport(unittest.TestCase):
+
+    def setUp(self):
+        self.filename = tempfile.mkstemp(prefix='_test')[1]
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_write(self):
+        report = VerifyReport(self.filename)
+        report.write(dict(saveset='saveset1', outcome='missing', id=7))
+        report.write(dict(saveset='saveset1', outcome='bad_checksum',
+                          id=8, file='dir/file'))
+        report.close(dict(status='error', results=[]))
+        with open(self.filename) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records, [
+            dict(record='file', saveset='saveset1', outcome='missing', id=7),
+            dict(record='file', saveset='saveset1', outcome='bad_checksum',
+                 id=8, file='dir/file'),
+            dict(record='summary', status='error', results=[], problems=2)])
+
+    @mock.patch('sys.stderr')
+    def test_stderr(self, mock_stderr):
+        report = VerifyReport('-')
+        report.close(dict(status='ok', results=[]))
+        mock_stderr.write.assert_called_once_with(
+            '{"problems": 0, "record": "summary", "results": [], '
+            '"status": "ok"}\n')
+        mock_stderr.close.assert_not_called()
@@ -0,0 +1,75 @@
+"""test_scheduler
+
+Tests for IOScheduler class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import errno
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from secondshot.scheduler import IOScheduler
+from secondshot.syslogger import Syslog
+
+
+class TestIOScheduler(unittest.TestCase):
+
+    @mock.patch('secondshot.syslogger.logger')
+    def setUp(self, mock_log):
+        self.logfile_name = tempfile.mkstemp(prefix='_test')[1]
+        Syslog.logger = Syslog({'log-level': 'none', 'verbose': None,
+                                'logfile': self.logfile_name})
+        self.path = tempfile.mkdtemp(prefix='_testdir')
+        self.items = []
+        for item in range(5):
+            filename = os.path.join(self.path, 'file%d' % item)
+            with open(filename, 'wb') as f:
+                f.write(os.urandom(8192))
+            self.items.append((0, 50 - item * 10, filename))
+
+    def tearDown(self):
+        os.remove(self.logfile_name)
+        shutil.rmtree(self.path)
+
+    @staticmethod
+    def _key(item):
+        return item
+
+    def test_manifest(self):
+        scheduler = IOScheduler('manifest')
+        self.assertEqual(scheduler.sort(self.items, self._key), self.items)
+
+    def test_inode(self):
+        scheduler = IOScheduler('inode')
+        self.assertEqual(scheduler.sort(self.items, self._key),
+                         list(reversed(self.items)))
+
+    def test_physical(self):
+        scheduler = IOScheduler('physical')
+        ret = scheduler.sort(self.items, self._key)
+        self.assertEqual(sorted(ret), sorted(self.items))
+        if (scheduler.fiemap):
+            offsets = [scheduler.physical_offset(item[2]) for item in ret]
+            self.assertEqual(offsets, sorted(offsets))
+        self.assertIsNone(scheduler.physical_offset(
+            os.path.join(self.path, 'missing')))
+
+    @mock.patch('fcntl.ioctl')
+    def test_physical_unsupported(self, mock_ioctl):
+        mock_ioctl.side_effect = OSError(errno.ENOTTY, 'unsupported')
+        scheduler = IOScheduler('physical')
+        self.assertEqual(scheduler.sort(self.items, self._key),
+                         list(reversed(self.items)))
+        self.assertFalse(scheduler.fiemap)
+
+    def test_schedule(self):
+        scheduler = IOScheduler('inode', window=2)
+        self.assertEqual(list(scheduler.schedule(self.items, self._key)), [
+            self.items[1], self.items[0], self.items[3], self.items[2],
+            self.items[4]])
@@ -0,0 +1,89 @@
+"""test_walker
+
+Tests for Walker class
+
+created 17-oct-2026 by richb@instantlinux.net
+
+license: lgpl-2.1
+"""
+
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+
+from secondshot.syslogger import Syslog
+from secondshot.walker import Walker
+
+
+class TestWalker(unittest.TestCase):
+
+    @mock.patch('secondshot.syslogger.logger')
+    def setUp(self, mock_log):
+        self.logfile_name = tempfile.mkstemp(prefix='_test')[1]
+        Syslog.logger = Syslog({'log-level': 'none', 'verbose': None,
+                                'logfile': self.logfile_name})
+        self.root = tempfile.mkdtemp(prefix='_testdir')
+        self.top = os.path.join(self.root, 'host')
+        for subdir in ['a', 'a/b', 'c']:
+            os.makedirs(os.path.join(self.top, subdir))
+        for filename in ['one', 'a/two', 'a/b/three', 'c/four',
+                         'c/.manifest']:
+            with open(os.path.join(self.top, filename), 'w') as f:
+                f.write(filename)
+        os.symlink('one', os.path.join(self.top, 'link'))
+        os.symlink('a', os.path.join(self.top, 'dirlink'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        os.remove(self.logfile_name)
+
+    def test_walk(self):
+        walker = Walker(self.top, self.root, exclude=['.manifest'])
+        ret = sorted((entry.path, entry.filename) for entry in walker)
+        self.assertEqual(ret, [
+            ('host', 'link'), ('host', 'one'), ('host/a', 'two'),
+            ('host/a/b', 'three'), ('host/c', 'four')])
+        self.assertEqual(walker.skipped, 0)
+
+        expected = sorted((os.path.relpath(dirpath, self.root), filename)
+                          for dirpath, _, filenames in os.walk(self.top)
+                          for filename in filenames
+                          if filename != '.manifest')
+        self.assertEqual(ret, expected)
+
+    def test_walk_parallel(self):
+        expected = sorted((entry.path, entry.filename) for entry in
+                          Walker(self.top, self.root))
+        for subdir in range(20):
+            os.makedirs(os.path.join(self.top, 'c', 'd%d' % subdir))
+            with open(os.path.join(self.top, 'c', 'd%d' % subdir, 'f'),
+                      'w') as f:
+                f.write('x')
+            expected.append(('host/c/d%d' % subdir, 'f'))
+        walker = Walker(self.top, self.root, workers=4)
+        ret = sorted((entry.path, entry.filename) for entry in walker)
+        self.assertEqual(ret, sorted(expected))
+
+    @mock.patch('secondshot.walker.Walker.scan_dir')
+    def test_walk_parallel_error(self, mock_scan):
+        mock_scan.side_effect = OSError(13, 'Permission denied')
+        with self.assertRaises(OSError):
+            list(Walker(self.top, self.root, workers=2))
+
+    def test_walk_stat(self):
+        for entry in Walker(self.top, self.root):
+            self.assertEqual(entry.stat, os.lstat(os.path.join(
+                self.root, entry.path, entry.filename)))
+
+    def test_walk_invalid_utf8(self):
+        with open(os.path.join(self.top.encode(), b'bad\xff'), 'w') as f:
+            f.write('x')
+        os.makedirs(os.path.join(self.top.encode(), b'dir\xfe'))
+        with open(os.path.join(self.top.encode(), b'dir\xfe', b'f'),
+                  'w') as f:
+            f.write('x')
+        walker = Walker(self.top, self.root)
+        self.assertEqual(len(list(walker)), 6)
+        self.assertEqual(walker.skipped, 2)